@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from typing import Dict, Hashable, List, Tuple
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for calls to a rate-limited API.
+    - success with normal latency: additive increase (+1 per `limit` successes)
+    - 429: multiplicative decrease (halve) and block new calls until Retry-After has passed
+    - latency well above the baseline of the same kind of call (queueing on the provider
+      side): gentle decrease. Calls differ in cost (single items vs. batches, fast vs.
+      strong models), so on_success() takes a key, e.g. (model, items), and each key keeps
+      its own latency EWMA and baseline. The baseline is the lowest EWMA seen, drifting up
+      towards the current EWMA by `baseline_decay` per call, so one fast outlier does not
+      set the bar forever.
+    One limiter is shared by every event loop of the process (each pipeline run uses
+    asyncio.run in a scheduler thread, the API serves on uvicorn's loop), so the cap holds
+    across all of them: the counters are guarded by a threading.Lock and a release wakes the
+    waiters of every loop (thread-safely for other loops).
+    """
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 increase: float = 1.0, decrease_factor: float = 0.5, latency_tolerance: float = 2.0,
+                 baseline_decay: float = 0.05):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.baseline_decay = baseline_decay
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency_ewma = None  # over all calls, for stats only
+        self._latency: Dict[Hashable, List[float]] = {}  # key -> [ewma, baseline]
+        self.successes = 0
+        self.rate_limited = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                wait = self.blocked_until - time.monotonic()
+                if wait <= 0 and self.in_flight < self.current_limit:
+                    self.in_flight += 1
+                    return self
+                waiter = loop.create_future()
+                self._waiters.append((loop, waiter))
+            try:
+                await asyncio.wait_for(waiter, timeout=wait if wait > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if (loop, waiter) in self._waiters:
+                        self._waiters.remove((loop, waiter))
+
+    async def __aexit__(self, exc_type, exc, tb):
+        with self._lock:
+            self.in_flight -= 1
+            waiters, self._waiters = self._waiters, []
+        running = asyncio.get_running_loop()
+        for loop, waiter in waiters:
+            if loop is running:
+                _wake(waiter)
+            else:
+                try:
+                    loop.call_soon_threadsafe(_wake, waiter)
+                except RuntimeError:
+                    pass  # that loop is closed; its waiters are gone
+
+    def on_success(self, latency: float, key: Hashable = None):
+        with self._lock:
+            self.successes += 1
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            series = self._latency.get(key)
+            if series is None:
+                series = self._latency[key] = [latency, latency]
+            else:
+                series[0] = 0.8 * series[0] + 0.2 * latency
+                ewma, baseline = series
+                series[1] = baseline + (ewma - baseline) * self.baseline_decay if ewma > baseline else ewma
+
+            if series[0] > series[1] * self.latency_tolerance:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def on_rate_limited(self, retry_after: float = None):
+        with self._lock:
+            self.rate_limited += 1
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def on_error(self):
+        with self._lock:
+            self.errors += 1
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "latency_ewma": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+            "successes": self.successes,
+            "rate_limited": self.rate_limited,
+            "errors": self.errors,
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+        }
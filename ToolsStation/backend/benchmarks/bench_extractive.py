@@ -0,0 +1,65 @@
+"""
+Extractive summarizer throughput benchmark.
+
+Usage (from backend/):
+    python benchmarks/bench_extractive.py [--items 500]
+
+Summarizes synthetic Chinese / English news descriptions (built from the QbitAI
+fixture intros) in one batch and one item at a time, and prints items/second.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from extractive import ExtractiveSummarizer
+from parsers import LxmlParser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+ENGLISH = [
+    "Researchers released a new open source model for efficient inference.",
+    "It runs on a single consumer GPU with 4-bit quantization.",
+    "The model beats larger baselines on math and coding benchmarks.",
+    "Training used a mixture of synthetic and curated web data.",
+    "Weights and code are available under the Apache 2.0 license.",
+    "The team plans to release a multimodal version next quarter.",
+]
+
+def build_corpus(count: int):
+    with open(os.path.join(FIXTURES_DIR, "qbitai.html"), encoding="utf-8") as f:
+        chinese = [item["description"] for item in LxmlParser().qbitai(f.read())]
+    rng = random.Random(0)
+    corpus = []
+    for i in range(count):
+        pool = chinese if i % 2 == 0 else ENGLISH
+        corpus.append(("" if pool is chinese else " ").join(rng.choice(pool) for _ in range(rng.randint(4, 12))))
+    return corpus
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=500)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.items)
+    summarizer = ExtractiveSummarizer()
+    summarizer.summarize_many(corpus[:10])  # warm-up
+
+    start = time.perf_counter()
+    summarizer.summarize_many(corpus)
+    batched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for text in corpus:
+        summarizer.summarize(text)
+    single = time.perf_counter() - start
+
+    print(f"items: {len(corpus)}, avg chars: {sum(map(len, corpus)) // len(corpus)}")
+    print(f"batched:  {len(corpus) / batched:>8.0f} items/s")
+    print(f"per item: {len(corpus) / single:>8.0f} items/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Parser backend benchmark against the saved HTML fixtures.
+
+Usage (from backend/):
+    python benchmarks/bench_parsers.py [--rounds 50]
+
+Prints items/second per fixture for every registered parser backend. Fixtures are
+benchmarks/fixtures/<parser method>*.html; refresh them from the live sites with
+benchmarks/save_fixtures.py before trusting the numbers for real markup.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parsers import PARSER_BACKENDS
+from save_fixtures import FIXTURES_DIR, PAGES
+
+def bench(parse, html: str, rounds: int):
+    items = parse(html)  # warm-up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        parse(html)
+    elapsed = time.perf_counter() - start
+    return len(items), elapsed / rounds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<32} {'backend':<8} {'items':>6} {'ms/page':>9} {'items/s':>10}")
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        fixture = os.path.basename(path)
+        method = next(method for method in PAGES if fixture.startswith(method))
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        for name, backend in PARSER_BACKENDS.items():
+            count, per_page = bench(getattr(backend(), method), html, args.rounds)
+            print(f"{fixture:<32} {name:<8} {count:>6} {per_page * 1000:>9.2f} {count / per_page:>10.0f}")
+
+if __name__ == "__main__":
+    main()
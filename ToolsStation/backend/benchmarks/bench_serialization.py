@@ -0,0 +1,68 @@
+"""
+Serialization time of a /api/v1/news page, before and after the response schemas.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py [--rows 300 1000 5000] [--repeat 20]
+
+- before: full NewsItem rows through FastAPI's jsonable_encoder + JSONResponse (json.dumps)
+- after: NewsPage(data=rows) (NewsItemOut list) through schemas.dump_json
+  (orjson when installed, otherwise pydantic's serializer)
+Both carry every column, so the bodies are the same size: the difference is the serializer.
+Rows are in-memory NewsItem objects with realistic field sizes, so only serialization is
+timed; mean ms per page and the body size are printed per row count.
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from database import NewsItem
+from schemas import NewsPage, dump_json, orjson
+
+def make_rows(count: int) -> list:
+    now = datetime.datetime.utcnow()
+    return [
+        NewsItem(
+            id=i, title=f"owner/repo-{i}", url=f"https://bench.test/{i}", source="GitHub Trending",
+            original_desc="A description of the project. " * 15, summary="这是一个开源项目的中文摘要。" * 10,
+            category="Technology", stars=f"{i},234", upvotes=None, thumbnail=None,
+            created_at=now - datetime.timedelta(minutes=i), stars_count=i * 1000 + 234, upvotes_count=None,
+            hotness=i % 1000,
+        )
+        for i in range(count)
+    ]
+
+def before(rows: list) -> bytes:
+    return JSONResponse(jsonable_encoder({"status": "success", "data": rows, "next_cursor": None})).body
+
+def after(rows: list) -> bytes:
+    return dump_json(NewsPage(data=rows, next_cursor=None))
+
+def mean_ms(fn, rows: list, repeat: int) -> float:
+    fn(rows)  # warm-up
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows)
+    return (time.perf_counter() - started) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[300, 1000, 5000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"serializer after: {'orjson' if orjson is not None else 'pydantic'}")
+    print(f"{'rows':>6} {'before ms':>10} {'after ms':>10} {'speedup':>8} {'before KB':>10} {'after KB':>9}")
+    for count in args.rows:
+        rows = make_rows(count)
+        before_ms, after_ms = mean_ms(before, rows, args.repeat), mean_ms(after, rows, args.repeat)
+        print(f"{count:>6} {before_ms:>10.1f} {after_ms:>10.1f} {before_ms / after_ms:>7.1f}x "
+              f"{len(before(rows)) / 1024:>10.0f} {len(after(rows)) / 1024:>9.0f}")
+
+if __name__ == "__main__":
+    main()
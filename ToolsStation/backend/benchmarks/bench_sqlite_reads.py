@@ -0,0 +1,141 @@
+"""
+Read latency of /api/v1/news while a crawl is committing, per SQLite profile.
+
+Usage (from backend/):
+    python benchmarks/bench_sqlite_reads.py [--seed 2000] [--items 2000] [--readers 4]
+
+Each case runs in a fresh process on a temporary database:
+- profile "default": SQLite defaults (rollback journal), SQLITE_TUNING=0
+- profile "tuned": WAL + pragmas from database.SQLITE_PRAGMAS
+- writer "long": one transaction for the whole crawl (the old process_news behaviour)
+- writer "chunked": PERSIST_BATCH_SIZE items per transaction on the dedicated writer connection
+The writer inserts `--items` rows, pausing as if waiting for summaries, while `--readers`
+concurrent clients call GET /api/v1/news; read p50 / p95 / p99 are printed per case.
+The writer runs in its own process so the numbers show database lock contention rather
+than GIL contention with the API.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))]
+
+def make_item(prefix: str, i: int) -> dict:
+    from popularity import popularity_fields
+
+    return {
+        "title": f"{prefix} item {i}", "url": f"https://bench.test/{prefix}/{i}", "source": "Bench",
+        "original_desc": "desc " * 40, "summary": "摘要" * 60, "category": "Other",
+        "stars": str(i), "upvotes": None, "thumbnail": None,
+        **popularity_fields(str(i), None, 5000),
+    }
+
+def crawl(writer: str, items: int, item_delay: float):
+    from database import WriterSession, NewsItem
+    from processor import NewsPipeline, PERSIST_BATCH_SIZE
+
+    if writer == "long":
+        db = WriterSession()
+        try:
+            for i in range(items):
+                db.add(NewsItem(**make_item("crawl", i)))
+                db.flush()
+                time.sleep(item_delay)
+            db.commit()
+        finally:
+            db.close()
+    else:
+        batch = []
+        for i in range(items):
+            batch.append(make_item("crawl", i))
+            time.sleep(item_delay)
+            if len(batch) == PERSIST_BATCH_SIZE:
+                NewsPipeline._write_batch(batch)
+                batch = []
+        NewsPipeline._write_batch(batch)
+
+def run_case(writer: str, seed: int, items: int, readers: int, item_delay: float) -> dict:
+    # Imported here: database reads DATABASE_URL / SQLITE_TUNING at import time
+    import httpx
+    from database import init_db
+    from processor import NewsPipeline
+    from main import app
+
+    init_db()
+    NewsPipeline._write_batch([make_item("seed", i) for i in range(seed)])
+
+    async def read_until(process, client, latencies):
+        while process.is_alive():
+            started = time.perf_counter()
+            response = await client.get("/api/v1/news", params={"limit": 20})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    async def main():
+        latencies = []
+        process = multiprocessing.get_context("spawn").Process(target=crawl, args=(writer, items, item_delay))
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            await client.get("/api/v1/news")  # warm-up
+            started = time.perf_counter()
+            process.start()
+            await asyncio.gather(*(read_until(process, client, latencies) for _ in range(readers)))
+            elapsed = time.perf_counter() - started
+        process.join()
+        return {
+            "reads": len(latencies),
+            "reads_per_s": len(latencies) / elapsed,
+            "p50": percentile(latencies, 0.5) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+        }
+
+    return asyncio.run(main())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed", type=int, default=2000, help="rows present before the crawl")
+    parser.add_argument("--items", type=int, default=2000, help="rows written by the crawl")
+    parser.add_argument("--readers", type=int, default=4, help="concurrent API clients")
+    parser.add_argument("--item-delay", type=float, default=0.002, help="seconds between crawl rows")
+    parser.add_argument("--case", help=argparse.SUPPRESS)  # internal: "<profile>:<writer>"
+    args = parser.parse_args()
+
+    if args.case:
+        writer = args.case.split(":")[1]
+        print(json.dumps(run_case(writer, args.seed, args.items, args.readers, args.item_delay)))
+        return
+
+    print(f"{'profile':<8} {'writer':<8} {'reads':>6} {'reads/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for profile in ("default", "tuned"):
+        for writer in ("long", "chunked"):
+            with tempfile.TemporaryDirectory() as tmp:
+                env = {
+                    **os.environ,
+                    "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                    "SQLITE_TUNING": "1" if profile == "tuned" else "0",
+                    "SUMMARY_CACHE_PATH": os.path.join(tmp, "summary_cache.db"),
+                    "ARTICLE_CACHE_PATH": os.path.join(tmp, "article_cache.db"),
+                }
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), "--case", f"{profile}:{writer}",
+                     "--seed", str(args.seed), "--items", str(args.items),
+                     "--readers", str(args.readers), "--item-delay", str(args.item_delay)],
+                    cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+            print(f"{profile:<8} {writer:<8} {result['reads']:>6} {result['reads_per_s']:>8.0f} "
+                  f"{result['p50']:>8.1f} {result['p95']:>8.1f} {result['p99']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Saves the live pages of the HTML sources as parser fixtures.
+
+Usage (from backend/):
+    python benchmarks/save_fixtures.py [--dated]
+
+Fetches each page with the crawler's headers and writes benchmarks/fixtures/<parser method>.html
+(--dated: <parser method>-YYYY-MM-DD.html, kept next to the older snapshots). The parser
+parity test and bench_parsers.py run on every fixture, so re-run this whenever a site changes.
+"""
+import argparse
+import datetime
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# ParserBackend method -> page it parses (the URLs of the crawler's fetchers)
+PAGES = {
+    "github_trending": "https://github.com/trending/python?since=daily",
+    "huggingface_papers": "https://huggingface.co/papers",
+    "qbitai": "https://www.qbitai.com/",
+}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dated", action="store_true", help="add today's date to the file names")
+    args = parser.parse_args()
+    from crawler import DEFAULT_HEADERS  # not needed by bench_parsers, which imports PAGES
+
+    suffix = f"-{datetime.date.today().isoformat()}" if args.dated else ""
+    with httpx.Client(headers=DEFAULT_HEADERS, follow_redirects=True, timeout=30.0) as client:
+        for method, url in PAGES.items():
+            response = client.get(url)
+            response.raise_for_status()
+            path = os.path.join(FIXTURES_DIR, f"{method}{suffix}.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(response.text)
+            print(f"{url} -> {os.path.relpath(path)} ({len(response.text) / 1024:.0f} KB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+# Point every engine and on-disk cache at a throwaway directory before the app modules
+# are imported, so the tests never touch ./news.db or the summary / article caches.
+_test_dir = tempfile.mkdtemp(prefix="ai-daily-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_test_dir, 'news.db')}"
+os.environ["SUMMARY_CACHE_PATH"] = os.path.join(_test_dir, "summary_cache.db")
+os.environ["ARTICLE_CACHE_PATH"] = os.path.join(_test_dir, "article_cache.db")
+
+import pytest
+from types import SimpleNamespace
+from database import DigestSnapshot, HttpValidator, NewsItem, SourceFingerprint, WriterSession, init_db
+
+init_db()
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(_test_dir, ignore_errors=True)
+
+@pytest.fixture
+def db():
+    """
+    WriterSession on the test database; news items, digest snapshots and the crawl state
+    (HTTP validators, source fingerprints) are removed afterwards.
+    """
+    from digest import digest_store
+
+    session = WriterSession()
+    yield session
+    session.rollback()
+    session.query(NewsItem).delete()
+    session.query(DigestSnapshot).delete()
+    session.query(HttpValidator).delete()
+    session.query(SourceFingerprint).delete()
+    session.commit()
+    session.close()
+    digest_store._snapshots.clear()
+
+@pytest.fixture
+def fake_llm(tmp_path):
+    """
+    Factory of LLMService instances with a summary cache of their own, whose sync and
+    async clients call `create(**kwargs)` (a plain function for the sync path, a coroutine
+    function for the async one). Without `create` the service keeps its real OpenAI
+    clients (OPENAI_API_KEY / OPENAI_BASE_URL from the environment).
+    """
+    from llm_service import LLMService
+    from loop_local import LoopLocal
+    from summary_cache import SummaryCache
+
+    def make(create=None):
+        service = LLMService()
+        if create is not None:
+            fake = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+            service.client = fake
+            service.async_clients = LoopLocal(lambda: fake)
+        service.cache = SummaryCache(path=str(tmp_path / "cache.db"))
+        return service
+    return make
@@ -1,8 +1,162 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import contextvars
+import hashlib
+from dataclasses import dataclass, field
+import httpx
 from loguru import logger
+from sources import Source, register_source
+from summary_tiers import TierPolicy
+from http_cache import NotModified, ValidatorCache
+from parsers import html_parser
 
-def fetch_github_trending():
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+@dataclass
+class SourceResult:
+    """
+    Outcome of one source in a crawl.
+    not_modified: every conditional GET answered 304, so nothing was parsed.
+    body_hash: sha256 over the raw bodies of the source's successful responses.
+    """
+    items: list = field(default_factory=list)
+    not_modified: bool = False
+    body_hash: str = None
+
+# Source currently being fetched (set per task by CrawlerEngine.run)
+current_source: contextvars.ContextVar = contextvars.ContextVar("current_source", default=None)
+
+class CrawlerEngine:
+    """
+    Async crawler engine shared by every fetch_* source.
+    All sources run concurrently on one event loop and share a single pooled
+    httpx.AsyncClient (HTTP/2 + keep-alive), so connections and TLS sessions
+    to the same host are reused instead of re-negotiated per request.
+    """
+    def __init__(self, max_connections: int = 20, max_keepalive_connections: int = 10, timeout: float = 15.0,
+                 validators: ValidatorCache = None, transport: httpx.AsyncBaseTransport = None):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=30.0
+        )
+        self.timeout = httpx.Timeout(timeout)
+        self.validators = validators
+        self.transport = transport # Injected in tests (httpx.MockTransport)
+        self.client = None
+        self._semaphores = {}
+        self._body_digests = {}  # source key -> [(url, sha256 of body)]
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            http2=True,
+            headers=DEFAULT_HEADERS,
+            limits=self.limits,
+            timeout=self.timeout,
+            follow_redirects=True,
+            transport=self.transport
+        )
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+        self.client = None
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        source = current_source.get()
+        semaphore = self._semaphores.get(source.key) if source else None
+        if semaphore is None:
+            return await self.client.request(method, url, **kwargs)
+        async with semaphore:
+            response = await self.client.request(method, url, **kwargs)
+        if response.status_code == 200:
+            self._body_digests[source.key].append((url, hashlib.sha256(response.content).hexdigest()))
+        return response
+
+    def body_hash(self, key: str) -> str:
+        """
+        Combined, order-independent hash of all bodies fetched by a source.
+        """
+        digests = self._body_digests.get(key)
+        if not digests:
+            return None
+        return hashlib.sha256("\n".join(f"{url} {digest}" for url, digest in sorted(digests)).encode("utf-8")).hexdigest()
+
+    async def get(self, url: str, conditional: bool = False, **kwargs) -> httpx.Response:
+        """
+        conditional=True sends stored ETag / Last-Modified validators and raises
+        NotModified on 304, so the caller skips parsing entirely.
+        """
+        if not (conditional and self.validators):
+            return await self.request("GET", url, **kwargs)
+
+        headers = {**self.validators.conditional_headers(url), **kwargs.pop("headers", {})}
+        response = await self.request("GET", url, headers=headers, **kwargs)
+        if response.status_code == 304:
+            logger.info(f"Not modified since last crawl: {url}")
+            raise NotModified(url)
+        if response.status_code == 200:
+            source = current_source.get()
+            self.validators.stage(url, response, source.key if source else None)
+        return response
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def _run_source(self, source: Source):
+        current_source.set(source)
+        self._semaphores[source.key] = asyncio.Semaphore(source.concurrency)
+        self._body_digests[source.key] = []
+        return await asyncio.wait_for(source.fetcher(self), timeout=source.timeout)
+
+    async def _fetch_source(self, source: Source):
+        """
+        Fetches one source. A failing or timed-out source yields no items instead of failing the crawl.
+        """
+        try:
+            items = await self._run_source(source)
+        except NotModified:
+            return source, SourceResult(not_modified=True)
+        except asyncio.TimeoutError:
+            logger.error(f"Crawler {source.key} timed out after {source.timeout}s")
+            return source, SourceResult()
+        except Exception as e:
+            logger.error(f"Error in crawler {source.key}: {e}")
+            return source, SourceResult()
+        return source, SourceResult(items=items, body_hash=self.body_hash(source.key))
+
+    async def iter_results(self, sources: list):
+        """
+        Runs all sources concurrently and yields (source, SourceResult) as each one finishes,
+        so downstream stages can start on fast sources while slow ones are still in flight.
+        """
+        # Each task runs in a copy of the context, so current_source is per source
+        tasks = [asyncio.create_task(self._fetch_source(source)) for source in sources]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def run(self, sources: list) -> dict:
+        """
+        Runs all sources concurrently. Returns {source.key: SourceResult}.
+        """
+        return {source.key: result async for source, result in self.iter_results(sources)}
+
+async def crawl_all(sources: list, validators: ValidatorCache = None) -> dict:
+    """
+    Opens one engine (one connection pool) and runs the given sources on it.
+    """
+    async with CrawlerEngine(validators=validators) as engine:
+        return await engine.run(sources)
+
+@register_source("gh", "GitHub Trending", timeout=20, schedule="hourly",
+                 summary_tiers=TierPolicy(short_chars=40, popular_at=5000), popularity_scale=5000,
+                 keywords=("github",))
+async def fetch_github_trending(engine: CrawlerEngine):
     """
     Fetches the trending repositories from GitHub (filtered by AI topics/languages if possible, 
     but for MVP let's just grab general trending or Python trending).
@@ -14,119 +168,51 @@ def fetch_github_trending():
     Let's try to fetch https://github.com/trending/python?since=daily which often has AI stuff.
     """
     url = "https://github.com/trending/python?since=daily"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
     
     try:
         logger.info(f"Fetching GitHub trending from {url}")
-        response = requests.get(url, headers=headers)
+        response = await engine.get(url, conditional=True)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, "lxml")
-        repos = []
-        
-        # GitHub trending structure (subject to change by GitHub)
-        # Each repo is in an <article class="Box-row">
-        articles = soup.select("article.Box-row")
-        
-        for article in articles:
-            # Title: h2 a -> href (link), text (owner/repo)
-            title_tag = article.select_one("h2 a")
-            if not title_tag:
-                continue
-                
-            repo_name = title_tag.text.strip().replace("\n", "").replace(" ", "")
-            repo_url = "https://github.com" + title_tag["href"]
-            
-            # Description: p
-            desc_tag = article.select_one("p")
-            description = desc_tag.text.strip() if desc_tag else "No description"
-            
-            # Stars: 
-            # span with octicon-star -> parent text
-            # Usually in the footer
-            stats = article.select_one("div.f6")
-            stars = "0"
-            if stats:
-                star_link = stats.select_one("a[href$='/stargazers']")
-                if star_link:
-                    stars = star_link.text.strip()
-            
-            repos.append({
-                "title": repo_name,
-                "url": repo_url,
-                "description": description,
-                "stars": stars,
-                "source": "GitHub Trending"
-            })
-            
+        repos = html_parser.github_trending(response.text)
         logger.info(f"Found {len(repos)} repos")
         return repos
         
+    except NotModified:
+        raise
     except Exception as e:
         logger.error(f"Error fetching GitHub trending: {e}")
         return []
 
-def fetch_huggingface_daily_papers():
+@register_source("hf", "Hugging Face Daily Papers", timeout=20, schedule="hourly",
+                 summary_tiers=TierPolicy(short_chars=0, popular_at=50),  # title only: always worth an LLM call
+                 popularity_scale=100, keywords=("huggingface", "hugging face", "论文"))
+async def fetch_huggingface_daily_papers(engine: CrawlerEngine):
     """
     Fetches the daily papers from Hugging Face Daily Papers.
     URL: https://huggingface.co/papers
     """
     url = "https://huggingface.co/papers"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
     
     try:
         logger.info(f"Fetching Hugging Face Daily Papers from {url}")
-        response = requests.get(url, headers=headers)
+        response = await engine.get(url, conditional=True)
         response.raise_for_status()
         
-        soup = BeautifulSoup(response.text, "lxml")
-        papers = []
-        
-        # Each paper is usually in an article tag or div with specific classes
-        # Currently (as of late 2024/early 2025), structure might be:
-        # article.flex.flex-col
-        # Let's try to find articles that look like papers
-        
-        articles = soup.select("article")
-        
-        for article in articles:
-            # Title is usually in an h3
-            title_tag = article.select_one("h3")
-            if not title_tag:
-                continue
-            
-            title = title_tag.text.strip()
-            link_tag = article.select_one("a")
-            paper_url = "https://huggingface.co" + link_tag["href"] if link_tag else ""
-            
-            # Upvotes
-            upvote_tag = article.select_one("div.leading-none")
-            upvotes = upvote_tag.text.strip() if upvote_tag else "0"
-            
-            # Thumbnail (optional)
-            img_tag = article.select_one("img")
-            thumbnail = img_tag["src"] if img_tag else ""
-
-            papers.append({
-                "title": title,
-                "url": paper_url,
-                "upvotes": upvotes,
-                "thumbnail": thumbnail,
-                "source": "Hugging Face Daily Papers"
-            })
-            
+        papers = html_parser.huggingface_papers(response.text)
         logger.info(f"Found {len(papers)} papers")
         return papers
 
+    except NotModified:
+        raise
     except Exception as e:
         logger.error(f"Error fetching Hugging Face papers: {e}")
         return []
 
-def fetch_juejin_ai_trending():
+@register_source("jj", "Juejin AI", timeout=15, schedule="fast",
+                 summary_tiers=TierPolicy(popular_at=100), popularity_scale=200,
+                 keywords=("掘金", "juejin"))
+async def fetch_juejin_ai_trending(engine: CrawlerEngine):
     """
     Fetches trending AI articles from Juejin (稀土掘金).
     API: https://api.juejin.cn/recommend_api/v1/article/recommend_all_feed
@@ -137,10 +223,6 @@ def fetch_juejin_ai_trending():
     Category ID for AI: 6809637773935378440
     """
     url = "https://api.juejin.cn/recommend_api/v1/article/recommend_cate_feed"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
-        "Content-Type": "application/json"
-    }
     payload = {
         "cate_id": "6809637773935378440", # AI category
         "id_type": 2,
@@ -150,7 +232,7 @@ def fetch_juejin_ai_trending():
     
     try:
         logger.info(f"Fetching Juejin AI Trending from API")
-        response = requests.post(url, json=payload, headers=headers)
+        response = await engine.post(url, json=payload)
         response.raise_for_status()
         
         data = response.json()
@@ -189,20 +271,20 @@ def fetch_juejin_ai_trending():
         logger.error(f"Error fetching Juejin articles: {e}")
         return []
 
-def fetch_reddit_ml_hot():
+@register_source("rd", "Reddit ML", timeout=10, schedule="fast",
+                 summary_tiers=TierPolicy(popular_at=500), popularity_scale=1000,
+                 keywords=("reddit",))
+async def fetch_reddit_ml_hot(engine: CrawlerEngine):
     """
     Fetches hot posts from Reddit r/MachineLearning or r/ArtificialInteligence.
     Since Reddit API requires auth, we can try using the JSON feed: https://www.reddit.com/r/MachineLearning/hot.json
     Note: Reddit aggressively rate limits user-agent scripts.
     """
     url = "https://www.reddit.com/r/MachineLearning/hot.json?limit=10"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
     
     try:
         logger.info(f"Fetching Reddit ML from {url}")
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await engine.get(url)
         # response.raise_for_status() # Reddit might return 429
         
         if response.status_code != 200:
@@ -240,59 +322,29 @@ def fetch_reddit_ml_hot():
         logger.error(f"Error fetching Reddit: {e}")
         return []
 
-def fetch_qbitai_news():
+@register_source("qbit", "QbitAI", timeout=10, schedule="hourly", keywords=("量子位",))
+async def fetch_qbitai_news(engine: CrawlerEngine):
     """
     Fetches AI news from QbitAI (量子位).
     URL: https://www.qbitai.com/
     """
     url = "https://www.qbitai.com/"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
     
     try:
         logger.info(f"Fetching QbitAI from {url}")
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await engine.get(url, conditional=True)
         response.encoding = 'utf-8' # Ensure correct encoding
         
-        soup = BeautifulSoup(response.text, "lxml")
-        articles = []
-        
-        # QbitAI structure: .text_box h4 a
-        titles = soup.select(".text_box h4 a")
-        
-        for link in titles:
-            title = link.text.strip()
-            href = link.get("href")
-            
-            if not title or not href: continue
-            
-            # Get description if possible (p.intro)
-            desc_tag = link.find_parent("div", class_="text_box").find("p", class_="intro") if link.find_parent("div", class_="text_box") else None
-            desc = desc_tag.text.strip() if desc_tag else title
-            
-            # Get thumbnail (img in sibling .picture)
-            # Structure: div.picture > a > img
-            # Need to go up to .item_inner then down to .picture
-            # This is complex, let's skip thumb or try simple search
-            thumbnail = None
-            
-            articles.append({
-                "title": title,
-                "url": href,
-                "description": desc,
-                "upvotes": None,
-                "thumbnail": thumbnail,
-                "source": "QbitAI"
-            })
-            
+        articles = html_parser.qbitai(response.text)
         logger.info(f"Found {len(articles)} QbitAI articles")
         return articles
+    except NotModified:
+        raise
     except Exception as e:
         logger.error(f"Error fetching QbitAI: {e}")
         return []
 
-def fetch_baai_updates():
+async def fetch_baai_updates(engine: CrawlerEngine):
     """
     Fetches updates from BAAI (Beijing Academy of Artificial Intelligence).
     Since API/HTML is hard to scrape, we will use a fallback or try scraping 
@@ -306,11 +358,8 @@ def fetch_baai_updates():
 
 if __name__ == "__main__":
     # Test run
-    # ... (Keep existing tests)
-    print("\n--- Reddit ML ---")
-    rd_data = fetch_reddit_ml_hot()
-    for item in rd_data[:2]: print(item)
-
-    print("\n--- QbitAI ---")
-    qbit_data = fetch_qbitai_news()
-    for item in qbit_data[:2]: print(item)
+    from sources import get_sources
+    results = asyncio.run(crawl_all(get_sources(["rd", "qbit"])))
+    for key, result in results.items():
+        print(f"\n--- {key} ---")
+        for item in result.items[:2]: print(item)
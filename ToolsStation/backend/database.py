@@ -1,7 +1,11 @@
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy import create_engine, event, inspect, Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import datetime
+import os
+import threading
 
 Base = declarative_base()
 
@@ -19,14 +23,184 @@ class NewsItem(Base):
     upvotes = Column(String, nullable=True)
     thumbnail = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Parsed from stars / upvotes at crawl time (popularity.popularity_fields)
+    stars_count = Column(Integer, nullable=True)
+    upvotes_count = Column(Integer, nullable=True)
+    hotness = Column(Integer, nullable=False, default=0, server_default="0")  # comparable across sources
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY created_at DESC, id DESC
+        Index("ix_news_items_created_at_id", "created_at", "id"),
+        # Same order within each source: one-source pages and per-source top-N windows
+        Index("ix_news_items_source_recent", "source", created_at.desc(), id.desc()),
+        # Hottest first, overall and per source (covers the per-source top-N window)
+        Index("ix_news_items_hot", hotness.desc(), created_at.desc(), id.desc()),
+        Index("ix_news_items_source_hot", "source", hotness.desc(), created_at.desc(), id.desc()),
+    )
+
+class HttpValidator(Base):
+    """
+    HTTP cache validators of the last successfully processed response per URL,
+    used by the crawler for conditional GETs (If-None-Match / If-Modified-Since).
+    """
+    __tablename__ = "http_validators"
+
+    url = Column(String, primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+class SourceFingerprint(Base):
+    """
+    Content fingerprints of the last processed crawl per source:
+    sha256 of the raw response bodies and of the normalized item list.
+    """
+    __tablename__ = "source_fingerprints"
+
+    source = Column(String, primary_key=True)  # Source.key
+    body_hash = Column(String, nullable=True)
+    items_hash = Column(String, nullable=True)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
-# SQLite database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./news.db"
+class DigestSnapshot(Base):
+    """
+    Immutable digest of one day and edition (digest.materialize_digest): the selected items
+    with pre-truncated summaries and the pre-rendered Feishu / WeChat payloads, as JSON.
+    """
+    __tablename__ = "digest_snapshots"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+    day = Column(String, primary_key=True)  # YYYY-MM-DD (server local date)
+    edition = Column(String, primary_key=True)  # "daily"
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    
+# SQLite by default; DATABASE_URL may point to PostgreSQL (with a sync driver, e.g. postgresql+psycopg2://)
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./news.db")
+
+def async_database_url(url: str) -> str:
+    """
+    Same database with the async driver: aiosqlite for SQLite, asyncpg for PostgreSQL.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if parsed.get_backend_name() == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg").render_as_string(hide_password=False)
+    return url
+
+IS_SQLITE = make_url(SQLALCHEMY_DATABASE_URL).get_backend_name() == "sqlite"
+_connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+
+# SQLite performance profile, applied to every new connection (SQLITE_TUNING=0 disables it)
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1") != "0"
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",      # readers see the last commit while the writer works, and vice versa
+    "synchronous": "NORMAL",    # fsync at checkpoints only; cannot corrupt the database in WAL mode
+    "mmap_size": 268435456,     # 256 MB of the file memory-mapped for reads
+    "cache_size": -65536,       # 64 MB page cache per connection
+    "busy_timeout": 5000,       # wait up to 5 s for a lock instead of failing with "database is locked"
+    "temp_store": "MEMORY",
+}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+# Sync engine: reads of the crawl pipeline (scheduler / background task threads) and scripts
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=_connect_args)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Dedicated writer: all writes share one connection, so concurrent writers queue in the pool
+# instead of contending for SQLite's single write lock. PostgreSQL uses the regular engine.
+writer_engine = create_engine(
+    SQLALCHEMY_DATABASE_URL, connect_args=_connect_args, pool_size=1, max_overflow=0, pool_timeout=60
+) if IS_SQLITE else engine
+WriterSession = sessionmaker(autocommit=False, autoflush=False, bind=writer_engine)
+
+class DataGeneration:
+    """
+    Counter bumped after every commit of the writer session (all writes go through it)
+    that changed news items or digest snapshots. In-process caches of query results
+    (response_cache, latest_news) are valid while it is unchanged.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def bump(self):
+        with self._lock:
+            self.value += 1
+
+data_generation = DataGeneration()
+
+# Models the read caches are built from; commits that touch only other tables
+# (HTTP validators, fingerprints) leave the generation alone
+NEWS_MODELS = (NewsItem, DigestSnapshot)
+
+@event.listens_for(WriterSession, "after_flush")
+def _note_changed_rows(session, flush_context):
+    if any(isinstance(obj, NEWS_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["news_changed"] = True
+
+@event.listens_for(WriterSession, "do_orm_execute")
+def _note_bulk_writes(state):
+    # insert(NewsItem) upserts, update(NewsItem) stats chunks, query(...).update()/delete()
+    if (state.is_insert or state.is_update or state.is_delete) and state.bind_mapper is not None \
+            and state.bind_mapper.class_ in NEWS_MODELS:
+        state.session.info["news_changed"] = True
+
+@event.listens_for(WriterSession, "after_commit")
+def _bump_data_generation(session):
+    if session.info.pop("news_changed", False):
+        data_generation.bump()
+
+@event.listens_for(WriterSession, "after_rollback")
+def _forget_rolled_back_changes(session):
+    session.info.pop("news_changed", None)
+
+# Async engine: request handlers, so reads never wait for a threadpool slot
+async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL))
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+if IS_SQLITE and SQLITE_TUNING:
+    for _engine in (engine, writer_engine, async_engine.sync_engine):
+        event.listen(_engine, "connect", _apply_sqlite_pragmas)
+
+def _ensure_columns():
+    """
+    create_all does not alter existing tables; add columns an existing database is missing
+    (nullable or with a server default, which ALTER TABLE ADD COLUMN supports).
+    """
+    with writer_engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=writer_engine.dialect)
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                if column.server_default is not None:
+                    ddl += f" DEFAULT {column.server_default.arg}"
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                conn.exec_driver_sql(ddl)
+
+def _ensure_indexes():
+    """
+    create_all only creates indexes together with new tables; add the ones an existing
+    database is missing.
+    """
+    inspector = inspect(writer_engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=writer_engine)
+
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=writer_engine)
+    _ensure_columns()
+    _ensure_indexes()
@@ -0,0 +1,156 @@
+import datetime
+import json
+import os
+import threading
+from typing import List, Optional
+from loguru import logger
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import DigestSnapshot, NewsItem, SessionLocal, WriterSession
+
+DIGEST_EDITION = "daily"
+DIGEST_SIZE = 10              # items per digest (Feishu card)
+DIGEST_SUMMARY_CHARS = 100    # summaries are cut here once, at materialization
+WECHAT_ARTICLES = 5           # WeChat news replies show at most 8 articles
+WECHAT_DESCRIPTION_CHARS = 50
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+
+def today() -> str:
+    return datetime.date.today().isoformat()
+
+def _truncate(text: str, limit: int) -> str:
+    return text[:limit] + "..." if len(text) > limit else text
+
+def digest_entry(item: NewsItem) -> dict:
+    return {
+        "id": item.id, "title": item.title, "url": item.url, "source": item.source,
+        "summary": _truncate(item.summary or "", DIGEST_SUMMARY_CHARS), "thumbnail": item.thumbnail,
+    }
+
+def wechat_articles(entries: List[dict]) -> List[dict]:
+    """
+    WeChat news reply articles (create_reply input) of the first WECHAT_ARTICLES entries.
+    """
+    return [
+        {
+            "title": entry["title"],
+            "description": _truncate(entry["summary"], WECHAT_DESCRIPTION_CHARS),
+            "image": entry["thumbnail"] or "",
+            "url": entry["url"],
+        }
+        for entry in entries[:WECHAT_ARTICLES]
+    ]
+
+def render_digest(items: List[NewsItem], day: str, edition: str = DIGEST_EDITION) -> dict:
+    """
+    Snapshot payload of `items`: the entries and everything the consumers send as is
+    (Feishu card title + markdown, WeChat news reply articles).
+    """
+    entries = [digest_entry(item) for item in items]
+
+    markdown = ""
+    for idx, entry in enumerate(entries, 1):
+        markdown += f"**{idx}. [{entry['title']}]({entry['url']})**\n"
+        if entry["summary"]:
+            markdown += f"{entry['summary']}\n"
+        markdown += f"_{entry['source']}_\n\n"
+    markdown += f"\n[查看完整列表]({FRONTEND_URL})"
+
+    return {
+        "day": day, "edition": edition, "created_at": datetime.datetime.utcnow().isoformat(),
+        "items": entries, "feishu_title": f"AI Daily Digest - {day}", "feishu_markdown": markdown,
+        "wechat_articles": wechat_articles(entries),
+    }
+
+class DigestStore:
+    """
+    Snapshots already read or written by this process, by (day, edition). Snapshots never
+    change once stored, so they are served from memory without another query.
+    """
+    def __init__(self):
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def get(self, day: str, edition: str = DIGEST_EDITION) -> Optional[dict]:
+        with self._lock:
+            return self._snapshots.get((day, edition))
+
+    def remember(self, payload: dict) -> dict:
+        with self._lock:
+            return self._snapshots.setdefault((payload["day"], payload["edition"]), payload)
+
+digest_store = DigestStore()
+
+def _newest_items(db) -> List[NewsItem]:
+    return db.scalars(
+        select(NewsItem).order_by(NewsItem.created_at.desc(), NewsItem.id.desc()).limit(DIGEST_SIZE)
+    ).all()
+
+def materialize_digest(day: Optional[str] = None, edition: str = DIGEST_EDITION) -> Optional[dict]:
+    """
+    The snapshot of `day` (default today) and `edition`, written from the newest items
+    if it does not exist yet. None when there is nothing to digest.
+    Only the scheduled daily run calls it (process_news(digest_edition=...)): a snapshot
+    is frozen once written, so it must be taken after that morning's crawl.
+    """
+    day = day or today()
+    payload = digest_store.get(day, edition)
+    if payload is not None:
+        return payload
+
+    db = WriterSession()
+    try:
+        row = db.get(DigestSnapshot, (day, edition))
+        if row is None:
+            items = _newest_items(db)
+            if not items:
+                return None
+            payload = render_digest(items, day, edition)
+            db.add(DigestSnapshot(day=day, edition=edition, payload=json.dumps(payload, ensure_ascii=False)))
+            try:
+                db.commit()
+                logger.info(f"Digest {day}/{edition} materialized with {len(items)} items")
+            except IntegrityError:
+                # Written concurrently by another process: the stored snapshot wins
+                db.rollback()
+                row = db.get(DigestSnapshot, (day, edition))
+        if row is not None:
+            payload = json.loads(row.payload)
+    finally:
+        db.close()
+    return digest_store.remember(payload)
+
+def current_digest(day: Optional[str] = None, edition: str = DIGEST_EDITION) -> Optional[dict]:
+    """
+    The snapshot of `day` (default today) if it has been materialized, otherwise a digest
+    of the newest items rendered without storing it ("provisional": True), so an early
+    manual push cannot freeze the day's snapshot. None when there is nothing to digest.
+    """
+    day = day or today()
+    payload = digest_store.get(day, edition)
+    if payload is not None:
+        return payload
+
+    db = SessionLocal()
+    try:
+        row = db.get(DigestSnapshot, (day, edition))
+        if row is not None:
+            return digest_store.remember(json.loads(row.payload))
+        items = _newest_items(db)
+        return {**render_digest(items, day, edition), "provisional": True} if items else None
+    finally:
+        db.close()
+
+async def load_digest(db: AsyncSession, day: Optional[str] = None, edition: str = DIGEST_EDITION) -> Optional[dict]:
+    """
+    The snapshot of `day`, or the most recent one of `edition` when day is None.
+    """
+    payload = digest_store.get(day or today(), edition)
+    if payload is not None:
+        return payload
+    query = select(DigestSnapshot.payload).where(DigestSnapshot.edition == edition)
+    if day:
+        query = query.where(DigestSnapshot.day == day)
+    raw = await db.scalar(query.order_by(DigestSnapshot.day.desc()).limit(1))
+    return digest_store.remember(json.loads(raw)) if raw else None
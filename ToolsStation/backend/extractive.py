@@ -0,0 +1,126 @@
+import os
+import re
+from typing import List
+import numpy as np
+import scipy.sparse as sp
+
+# Sentence ends: Chinese / English punctuation and line breaks
+_SENTENCE_END = re.compile(r"(?<=[。！？；!?;])|(?<=[.])\s+|\n+")
+_LATIN_WORD = re.compile(r"[a-z0-9][a-z0-9+#.\-]*")
+_CJK_RUN = re.compile(r"[一-鿿]+")
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in _SENTENCE_END.split(text or "") if s and s.strip()]
+
+def bigram_tokens(sentence: str) -> List[str]:
+    """
+    Dictionary-free tokenizer: lowercase latin words plus CJK character bigrams.
+    """
+    lowered = sentence.lower()
+    tokens = _LATIN_WORD.findall(lowered)
+    for run in _CJK_RUN.findall(lowered):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+def jieba_tokens(sentence: str) -> List[str]:
+    import jieba
+    return [t for t in jieba.lcut(sentence.lower()) if t.strip()]
+
+class ExtractiveSummarizer:
+    """
+    Offline TF-IDF extractive summarizer for the non-LLM path.
+    A whole batch is scored at once: one sparse sentence x term TF-IDF matrix, and every
+    sentence's cosine similarity to its document centroid (plus a small lead bonus, as news
+    puts the key sentence first). Top sentences are kept, in original order, up to max_chars.
+    Tokenizer: dictionary-free CJK bigrams by default, jieba with EXTRACTIVE_TOKENIZER=jieba.
+    """
+    def __init__(self, max_chars: int = 150, tokenizer: str = None, lead_bonus: float = 0.1):
+        self.max_chars = max_chars
+        self.lead_bonus = lead_bonus
+        tokenizer = tokenizer or os.getenv("EXTRACTIVE_TOKENIZER", "bigram")
+        self.tokenize = jieba_tokens if tokenizer == "jieba" else bigram_tokens
+
+    def summarize(self, text: str) -> str:
+        return self.summarize_many([text])[0]
+
+    def summarize_many(self, texts: List[str]) -> List[str]:
+        results = [None] * len(texts)
+        sentences, doc_ids, positions = [], [], []
+        for idx, text in enumerate(texts):
+            text = (text or "").strip()
+            doc_sentences = list(dict.fromkeys(split_sentences(text)))  # drop repeated sentences
+            if len(text) <= self.max_chars or len(doc_sentences) <= 1:
+                results[idx] = self._truncate(" ".join(text.split()))
+                continue
+            sentences.extend(doc_sentences)
+            doc_ids.extend([idx] * len(doc_sentences))
+            positions.extend(range(len(doc_sentences)))
+
+        if sentences:
+            scores = self._score(sentences, np.array(doc_ids), np.array(positions))
+            self._select(texts, sentences, np.array(doc_ids), scores, results)
+        return results
+
+    def _score(self, sentences: List[str], doc_ids: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        vocabulary = {}
+        rows, cols = [], []
+        for row, sentence in enumerate(sentences):
+            for token in self.tokenize(sentence):
+                cols.append(vocabulary.setdefault(token, len(vocabulary)))
+                rows.append(row)
+
+        n_sents = len(sentences)
+        counts = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                               shape=(n_sents, max(1, len(vocabulary))))
+        counts.sum_duplicates()
+
+        # Sublinear TF x smoothed IDF, rows L2-normalized
+        tfidf = counts.copy()
+        tfidf.data = np.log1p(tfidf.data)
+        df = np.bincount(tfidf.indices, minlength=tfidf.shape[1])
+        idf = np.log((1 + n_sents) / (1 + df)) + 1.0
+        tfidf = tfidf.multiply(idf.astype(np.float32)).tocsr()
+        tfidf = self._normalize_rows(tfidf)
+
+        # Document centroids via a doc x sentence indicator matrix
+        unique_docs, doc_index = np.unique(doc_ids, return_inverse=True)
+        indicator = sp.csr_matrix((np.ones(n_sents, dtype=np.float32), (doc_index, np.arange(n_sents))),
+                                  shape=(len(unique_docs), n_sents))
+        centroids = self._normalize_rows((indicator @ tfidf).tocsr())
+
+        similarity = np.asarray(tfidf.multiply(centroids[doc_index]).sum(axis=1)).ravel()
+        return similarity * (1.0 + self.lead_bonus / (1.0 + positions))
+
+    @staticmethod
+    def _normalize_rows(matrix: sp.csr_matrix) -> sp.csr_matrix:
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        return sp.diags(1.0 / norms) @ matrix
+
+    def _select(self, texts, sentences, doc_ids, scores, results):
+        # Sentences of one document are contiguous, so split the arrays at document boundaries
+        boundaries = np.flatnonzero(np.diff(doc_ids)) + 1
+        for start, end in zip(np.r_[0, boundaries], np.r_[boundaries, len(sentences)]):
+            chosen, length = [], 0
+            for offset in np.argsort(-scores[start:end], kind="stable"):
+                sentence_len = len(sentences[start + offset])
+                if chosen and length + sentence_len > self.max_chars:
+                    break
+                chosen.append(offset)
+                length += sentence_len
+            results[doc_ids[start]] = self._truncate("".join(
+                sentences[start + offset] if self._is_cjk_end(sentences[start + offset]) else sentences[start + offset] + " "
+                for offset in sorted(chosen)
+            ).strip())
+
+    @staticmethod
+    def _is_cjk_end(sentence: str) -> bool:
+        return sentence[-1] in "。！？；"
+
+    def _truncate(self, text: str) -> str:
+        return text[:self.max_chars] + "..." if len(text) > self.max_chars else text
+
+extractive_summarizer = ExtractiveSummarizer()
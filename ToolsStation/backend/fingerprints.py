@@ -0,0 +1,70 @@
+import hashlib
+import json
+from typing import Dict, List, Tuple
+from loguru import logger
+from database import SessionLocal, WriterSession, SourceFingerprint
+
+# Fields that make up an item's identity/content; anything else (e.g. ordering) is ignored
+ITEM_FIELDS = ("url", "title", "description", "stars", "upvotes", "thumbnail")
+
+def hash_items(items: List[dict]) -> str:
+    """
+    Order-independent sha256 of the normalized item list.
+    """
+    normalized = sorted(
+        json.dumps({k: item.get(k) for k in ITEM_FIELDS}, ensure_ascii=False, sort_keys=True)
+        for item in items
+    )
+    return hashlib.sha256("\n".join(normalized).encode("utf-8")).hexdigest()
+
+class FingerprintStore:
+    """
+    Per-source (body_hash, items_hash) of the last processed crawl (table source_fingerprints).
+    A source whose raw body or normalized items are unchanged is skipped before dedup and
+    summarization. Like ValidatorCache, new fingerprints are only persisted by save(),
+    after the pipeline has committed the items they describe.
+    """
+    def __init__(self, entries: Dict[str, Tuple[str, str]] = None):
+        self._entries = entries or {}  # source key -> (body_hash, items_hash)
+        self._pending = {}
+
+    @classmethod
+    def load(cls) -> "FingerprintStore":
+        db = SessionLocal()
+        try:
+            rows = db.query(SourceFingerprint.source, SourceFingerprint.body_hash, SourceFingerprint.items_hash).all()
+            return cls({source: (body_hash, items_hash) for source, body_hash, items_hash in rows})
+        finally:
+            db.close()
+
+    def check(self, key: str, body_hash: str, items: List[dict]) -> bool:
+        """
+        Returns True if the source content is unchanged since the last processed crawl.
+        Otherwise stages the new fingerprint and returns False.
+        """
+        items_hash = hash_items(items)
+        old_body_hash, old_items_hash = self._entries.get(key, (None, None))
+        if (body_hash and body_hash == old_body_hash) or items_hash == old_items_hash:
+            return True
+        self._pending[key] = (body_hash, items_hash)
+        return False
+
+    def discard(self, key: str):
+        """
+        Drops the staged fingerprint of a source whose items were not all processed.
+        """
+        self._pending.pop(key, None)
+
+    def save(self):
+        if not self._pending:
+            return
+        db = WriterSession()
+        try:
+            for key, (body_hash, items_hash) in self._pending.items():
+                db.merge(SourceFingerprint(source=key, body_hash=body_hash, items_hash=items_hash))
+            db.commit()
+            self._entries.update(self._pending)
+            logger.info(f"Saved content fingerprints for {len(self._pending)} sources")
+            self._pending = {}
+        finally:
+            db.close()
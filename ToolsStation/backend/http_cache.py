@@ -0,0 +1,77 @@
+from typing import Dict, Tuple
+import httpx
+from loguru import logger
+from database import SessionLocal, WriterSession, HttpValidator
+
+class NotModified(Exception):
+    """
+    Raised by CrawlerEngine when a conditional GET answers 304.
+    Fetchers must let it propagate so the source skips parsing and processing.
+    """
+    def __init__(self, url: str):
+        super().__init__(f"Not modified: {url}")
+        self.url = url
+
+class ValidatorCache:
+    """
+    Persistent ETag / Last-Modified store keyed by URL (table http_validators).
+    Validators of fresh responses are staged in memory and only written by save(),
+    which the pipeline calls after the items have been committed. Otherwise a crash
+    between fetch and commit would turn the next run into a 304 and lose those items.
+    """
+    def __init__(self, entries: Dict[str, Tuple[str, str]] = None):
+        self._entries = entries or {}  # url -> (etag, last_modified)
+        self._pending = {}
+        self._pending_by_source = {}  # source key -> staged urls
+
+    @classmethod
+    def load(cls) -> "ValidatorCache":
+        db = SessionLocal()
+        try:
+            rows = db.query(HttpValidator.url, HttpValidator.etag, HttpValidator.last_modified).all()
+            return cls({url: (etag, last_modified) for url, etag, last_modified in rows})
+        finally:
+            db.close()
+
+    def conditional_headers(self, url: str) -> dict:
+        etag, last_modified = self._entries.get(url, (None, None))
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def stage(self, url: str, response: httpx.Response, source_key: str = None):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._pending[url] = (etag, last_modified)
+            if source_key:
+                self._pending_by_source.setdefault(source_key, []).append(url)
+
+    def discard(self, source_key: str):
+        """
+        Drops the staged validators of a source whose items were not all processed,
+        so its pages are fully fetched again on the next run.
+        """
+        for url in self._pending_by_source.pop(source_key, []):
+            self._pending.pop(url, None)
+
+    def save(self):
+        """
+        Persists staged validators.
+        """
+        if not self._pending:
+            return
+        db = WriterSession()
+        try:
+            for url, (etag, last_modified) in self._pending.items():
+                db.merge(HttpValidator(url=url, etag=etag, last_modified=last_modified))
+            db.commit()
+            self._entries.update(self._pending)
+            logger.info(f"Saved HTTP validators for {len(self._pending)} URLs")
+            self._pending = {}
+            self._pending_by_source = {}
+        finally:
+            db.close()
@@ -0,0 +1,101 @@
+import json
+import threading
+import time
+from loguru import logger
+from sqlalchemy import select
+from database import DigestSnapshot, NewsItem, SessionLocal, data_generation
+from digest import DIGEST_EDITION, WECHAT_ARTICLES, digest_entry, wechat_articles
+from news_queries import top_per_source_query
+
+CATEGORIES = ("Technology", "Product", "Other")  # processor.determine_category
+
+class LatestNewsCache:
+    """
+    The newest items and the WeChat reply articles, held in memory so the WeChat handler
+    answers without a database query or an await.
+    Article lists: "latest", "digest" (latest daily digest), "source:<name>" and "category:<name>".
+    The cache is dirty once database.data_generation (bumped by commits that change news
+    items or digest snapshots) has moved past the generation it was built from;
+    refresh_if_dirty() rebuilds it once at the end of a pipeline run (process_news) or of
+    a single edit (save_summary). A refresh swaps in a whole new snapshot; readers
+    never see a half-built one.
+    """
+    def __init__(self, size: int = WECHAT_ARTICLES):
+        self.size = size
+        self._snapshot = None  # {"items": [...], "articles": {name: [...]}}
+        self._lock = threading.Lock()
+        self._generation = None  # data_generation the snapshot was built from
+        self.refreshes = 0
+        self.errors = 0
+        self.last_refresh_ms = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def dirty(self) -> bool:
+        return self._generation != data_generation.value
+
+    def refresh(self):
+        started = time.perf_counter()
+        with self._lock:
+            generation = data_generation.value  # commits from here on make it dirty again
+            db = SessionLocal()
+            try:
+                items = db.scalars(
+                    select(NewsItem).order_by(NewsItem.created_at.desc(), NewsItem.id.desc()).limit(self.size)
+                ).all()
+                digest = db.scalar(
+                    select(DigestSnapshot.payload).where(DigestSnapshot.edition == DIGEST_EDITION)
+                    .order_by(DigestSnapshot.day.desc()).limit(1)
+                )
+                entries = [digest_entry(item) for item in items]
+                articles = {
+                    "latest": wechat_articles(entries),
+                    "digest": json.loads(digest)["wechat_articles"] if digest else [],
+                }
+                groups = {}
+                for item, rank in db.execute(top_per_source_query(self.size)).all():
+                    groups.setdefault(f"source:{item.source}", []).append(digest_entry(item))
+                for category in CATEGORIES:
+                    newest = db.scalars(
+                        select(NewsItem).where(NewsItem.category == category)
+                        .order_by(NewsItem.created_at.desc(), NewsItem.id.desc()).limit(self.size)
+                    ).all()
+                    groups[f"category:{category}"] = [digest_entry(item) for item in newest]
+                articles.update((name, wechat_articles(group)) for name, group in groups.items())
+            except Exception as e:
+                # Keep serving the previous snapshot
+                self.errors += 1
+                logger.error(f"Latest news cache refresh failed: {e}")
+                return
+            finally:
+                db.close()
+            self._snapshot = {"items": entries, "articles": articles}
+            self._generation = generation
+            self.refreshes += 1
+            self.last_refresh_ms = (time.perf_counter() - started) * 1000
+
+    def refresh_if_dirty(self):
+        if self.dirty or not self.loaded:
+            self.refresh()
+
+    def articles(self, name: str) -> list:
+        """
+        Pre-rendered reply articles of a list name (empty if unknown or before the first refresh).
+        """
+        snapshot = self._snapshot
+        return snapshot["articles"].get(name, []) if snapshot else []
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "items": len(snapshot["items"]) if snapshot else 0,
+            "dirty": self.dirty,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "last_refresh_ms": round(self.last_refresh_ms, 2),
+        }
+
+latest_news = LatestNewsCache()
@@ -0,0 +1,65 @@
+import threading
+from collections import deque
+from typing import Optional
+
+def _percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(round(pct * (len(ordered) - 1))))], 3)
+
+class LLMMetrics:
+    """
+    Per (model, base_url) call metrics: time to first token (streaming calls only),
+    total latency and prompt / completion / prefix-cached prompt token counts.
+    Keeps running totals plus the last `window` samples for percentiles.
+    """
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def record(self, model: str, base_url: str, latency: float, ttft: float = None,
+               prompt_tokens: int = None, completion_tokens: int = None, cached_tokens: int = None):
+        with self._lock:
+            series = self._series.setdefault((model, base_url), {
+                "calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+                "latency": deque(maxlen=self.window), "ttft": deque(maxlen=self.window),
+            })
+            series["calls"] += 1
+            series["prompt_tokens"] += prompt_tokens or 0
+            series["completion_tokens"] += completion_tokens or 0
+            series["cached_tokens"] += cached_tokens or 0
+            series["latency"].append(latency)
+            if ttft is not None:
+                series["ttft"].append(ttft)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [
+                {
+                    "model": model,
+                    "base_url": base_url,
+                    "calls": series["calls"],
+                    "prompt_tokens": series["prompt_tokens"],
+                    "completion_tokens": series["completion_tokens"],
+                    "cached_tokens": series["cached_tokens"],
+                    "latency_p50": _percentile(series["latency"], 0.5),
+                    "latency_p95": _percentile(series["latency"], 0.95),
+                    "ttft_p50": _percentile(series["ttft"], 0.5),
+                    "ttft_p95": _percentile(series["ttft"], 0.95),
+                }
+                for (model, base_url), series in self._series.items()
+            ]
+
+    def token_totals(self) -> dict:
+        """
+        Provider-reported token totals over all models.
+        """
+        with self._lock:
+            return {
+                key: sum(series[key] for series in self._series.values())
+                for key in ("prompt_tokens", "completion_tokens", "cached_tokens")
+            }
+
+llm_metrics = LLMMetrics()
@@ -1,96 +1,406 @@
+import asyncio
+import json
 import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, List, Optional
 import openai
 from loguru import logger
 from dotenv import load_dotenv
-from newspaper import Article, Config
+from summary_cache import SummaryCache
+from adaptive_limiter import AdaptiveLimiter
+from llm_metrics import llm_metrics
+from local_summarizer import LocalSummarizer
+from summary_tiers import tier_metrics
+from prompt_builder import prompt_builder
+from loop_local import LoopLocal
 
 load_dotenv()
 
+# Bump whenever the summary prompt changes, so cached summaries of the old prompt are not reused
+PROMPT_TEMPLATE_VERSION = "v2"
+
+# Transient failures worth retrying (429, timeouts, connection errors, 5xx)
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+MAX_RETRIES = 4
+
+class SummaryError(Exception):
+    """
+    Summary could not be generated.
+    retryable: the provider was unavailable (retries exhausted on 429 / 5xx / timeouts);
+    callers must not persist anything for the item, so it is retried on the next run.
+    Otherwise the error is permanent (rejected request, empty reply) and asking again
+    would not help, so callers may store a fallback summary instead.
+    """
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Parses retry-after-ms / Retry-After (seconds or HTTP date) from an API error response.
+    """
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        if value.strip().isdigit():
+            return float(value)
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (ValueError, TypeError):
+        return None
+
 class LLMService:
     def __init__(self):
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
         self.model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+        # Models of the LLM summary tiers (see summary_tiers); both default to OPENAI_MODEL
+        self.tier_models = {
+            "fast": os.getenv("OPENAI_MODEL_FAST", self.model),
+            "strong": os.getenv("OPENAI_MODEL_STRONG", self.model),
+        }
         
         if self.api_key:
             self.client = openai.OpenAI(api_key=self.api_key, base_url=self.base_url)
+            # One AsyncOpenAI per event loop (pipeline runs vs. API), closed by aclose()
+            self.async_clients = LoopLocal(self._new_async_client, close=lambda client: client.close())
         else:
             self.client = None
+            self.async_clients = None
             logger.warning("OPENAI_API_KEY not found. LLM service will be disabled/mocked.")
 
+        self.limiter = AdaptiveLimiter(
+            initial=int(os.getenv("LLM_INITIAL_CONCURRENCY", "4")),
+            max_limit=int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+        )
+
+        self.cache = SummaryCache()
+        self.local = LocalSummarizer()
+        self.fallbacks = 0  # LLM failures answered with an extractive summary
+
+    def _new_async_client(self) -> openai.AsyncOpenAI:
+        # Retries are done by _complete() so they go through the adaptive limiter
+        return openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+
+    async def aclose(self):
+        """
+        Closes the running event loop's clients; every pipeline run calls it before its loop ends.
+        """
+        await self.local.aclose()
+        if self.async_clients is not None:
+            await self.async_clients.aclose()
+
     def generate_summary(self, text: str, context: str = "", url: str = None) -> str:
         """
         Generates a Chinese summary for the given text.
         If no API key is present, uses local NLP (newspaper3k) to extract summary from URL or text.
+        LLM summaries are cached by (model, prompt version, normalized text); the context is
+        deliberately not part of the key, so the same paper from two sources is summarized once.
+        Raises SummaryError when the LLM call fails (nothing must be persisted for the item).
         """
         if not self.client:
             return self.generate_local_summary(url, text)
             
-        try:
-            prompt = f"""
-            Please summarize the following content into a concise Chinese summary (around 100-150 words). 
-            The content is about AI/Technology.
-            
-            Context: {context}
-            Content: {text}
-            
-            Summary in Chinese:
-            """
+        cache_key = SummaryCache.make_key(self.model, PROMPT_TEMPLATE_VERSION, text)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
             
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful AI assistant that summarizes tech news into Chinese."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=300,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
+        try:
+            request = self._summary_request(text, context)
+            started = time.perf_counter()
+            response = self.client.chat.completions.create(**request)
+            self._record(request["model"], time.perf_counter() - started, getattr(response, "usage", None))
             
+            summary = (response.choices[0].message.content or "").strip()
         except Exception as e:
             logger.error(f"Error calling LLM: {e}")
-            return f"（生成摘要失败: {str(e)}）"
+            raise SummaryError(f"LLM request failed: {e}", retryable=isinstance(e, RETRYABLE_ERRORS)) from e
+        if not summary:
+            raise SummaryError("LLM returned an empty summary")
+        self.cache.set(cache_key, summary)
+        return summary
 
-    def generate_local_summary(self, url: str, text: str) -> str:
+    def generate_summaries(self, items: List[dict]) -> List[str]:
         """
-        Uses newspaper3k to extract summary locally without LLM.
+        Summarizes several items with one chat completion.
+        items: [{"text": ..., "context": ..., "url": ...}]; returns summaries in the same order.
+        Cached items are not sent. Items missing from (or all items of) an unparsable
+        batch reply fall back to per-item generate_summary calls, which raise SummaryError.
         """
-        try:
-            if not url:
-                # Fallback to simple truncation if no URL provided
-                return text[:150] + "..." if len(text) > 150 else text
+        if not self.client or len(items) == 1:
+            return [self.generate_summary(item["text"], item.get("context", ""), url=item.get("url")) for item in items]
 
-            logger.info(f"Generating local summary for: {url}")
-            
-            # Configure newspaper
-            config = Config()
-            config.browser_user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            config.request_timeout = 10
-            
-            article = Article(url, config=config, language='zh') # Default to zh, auto-detects
-            article.download()
-            article.parse()
-            article.nlp()
-            
-            summary = article.summary
-            
-            if not summary:
-                # Fallback if NLP fails to extract summary
-                if article.text:
-                    summary = article.text[:200] + "..."
+        summaries = [None] * len(items)
+        keys = [SummaryCache.make_key(self.model, PROMPT_TEMPLATE_VERSION, item["text"]) for item in items]
+        pending = []
+        for idx, key in enumerate(keys):
+            summaries[idx] = self.cache.get(key)
+            if summaries[idx] is None:
+                pending.append(idx)
+
+        if len(pending) > 1:
+            try:
+                request = self._batch_request(items, pending)
+                started = time.perf_counter()
+                response = self.client.chat.completions.create(**request)
+                self._record(request["model"], time.perf_counter() - started, getattr(response, "usage", None))
+                self._apply_batch_reply(response.choices[0].message.content, pending, keys, summaries)
+            except Exception as e:
+                logger.warning(f"Batch summary of {len(pending)} items failed, falling back to per-item calls: {e}")
+
+        # Per-item fallback for anything the batch did not cover
+        for idx in pending:
+            if summaries[idx] is None:
+                item = items[idx]
+                summaries[idx] = self.generate_summary(item["text"], item.get("context", ""), url=item.get("url"))
+        return summaries
+
+    def _summary_request(self, text: str, context: str, model: str = None) -> dict:
+        return {
+            "model": model or self.model,
+            "messages": prompt_builder.summary_messages(text, context),
+            "max_tokens": 300,
+            "temperature": 0.7
+        }
+
+    def _batch_request(self, items: List[dict], pending: List[int], model: str = None) -> dict:
+        batch = [{"id": str(idx), "context": items[idx].get("context", ""), "content": items[idx]["text"]} for idx in pending]
+        return {
+            "model": model or self.model,
+            "messages": prompt_builder.batch_messages(batch),
+            "response_format": {"type": "json_object"},
+            "max_tokens": 300 * len(batch),
+            "temperature": 0.7
+        }
+
+    def _apply_batch_reply(self, content: str, pending: List[int], keys: List[str], summaries: List[Optional[str]]):
+        """
+        Fills summaries from a batch JSON reply and caches them. Raises on unparsable replies.
+        """
+        for entry in json.loads(content)["summaries"]:
+            idx = int(entry["id"])
+            summary = str(entry.get("summary") or "").strip()
+            if idx in pending and summary:
+                summaries[idx] = summary
+                self.cache.set(keys[idx], summary)
+
+    def _record(self, model: str, latency: float, usage, ttft: float = None):
+        llm_metrics.record(
+            model, self.base_url, latency, ttft=ttft,
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None),
+            # Prompt tokens served from the provider's prefix cache (OpenAI / DeepSeek field names)
+            cached_tokens=getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+                          or getattr(usage, "prompt_cache_hit_tokens", None)
+        )
+
+    async def _complete(self, request: dict, items: int = 1):
+        """
+        One chat completion (summarizing `items` items) through the adaptive limiter, whose
+        latency baseline is kept per (model, items).
+        Retries transient errors with exponential backoff (or the server's Retry-After);
+        raises SummaryError when the error is permanent or retries are exhausted.
+        """
+        for attempt in range(MAX_RETRIES + 1):
+            delay = None
+            async with self.limiter:
+                started = time.perf_counter()
+                try:
+                    response = await self.async_clients.get().chat.completions.create(**request)
+                except openai.RateLimitError as e:
+                    delay = retry_after_seconds(e)
+                    self.limiter.on_rate_limited(delay)
+                    error = e
+                except RETRYABLE_ERRORS as e:
+                    self.limiter.on_error()
+                    error = e
+                except openai.OpenAIError as e:
+                    raise SummaryError(f"LLM request failed: {e}") from e
                 else:
-                    return text[:150] + "..."
-            
-            # Ensure it's not too long
-            if len(summary) > 300:
-                summary = summary[:300] + "..."
-                
-            return f"[自动提取] {summary}"
-            
-        except Exception as e:
-            logger.warning(f"Local summary generation failed for {url}: {e}")
-            return text[:150] + "..."
+                    latency = time.perf_counter() - started
+                    self.limiter.on_success(latency, key=(request["model"], items))
+                    self._record(request["model"], latency, getattr(response, "usage", None))
+                    return response
+
+            if attempt == MAX_RETRIES:
+                break
+            delay = delay if delay is not None else min(30.0, 2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"LLM call failed ({type(error).__name__}), retry {attempt + 1}/{MAX_RETRIES} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        raise SummaryError(f"LLM request failed after {MAX_RETRIES} retries: {error}", retryable=True) from error
+
+    async def asummarize(self, text: str, context: str = "", url: str = None, model: str = None) -> str:
+        """
+        Async generate_summary (on `model`, default OPENAI_MODEL).
+        Raises SummaryError instead of returning failure text.
+        """
+        if self.async_clients is None:
+            return await self.local.summarize(url, text)
+
+        model = model or self.model
+        cache_key = SummaryCache.make_key(model, PROMPT_TEMPLATE_VERSION, text)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        response = await self._complete(self._summary_request(text, context, model))
+        summary = (response.choices[0].message.content or "").strip()
+        if not summary:
+            raise SummaryError("LLM returned an empty summary")
+        self.cache.set(cache_key, summary)
+        return summary
+
+    async def astream_summary(self, text: str, context: str = "", url: str = None) -> AsyncIterator[str]:
+        """
+        Streams a summary: yields text deltas as tokens arrive and records time to first
+        token. Not retried (output may already have been shown); raises SummaryError.
+        The complete summary is cached like asummarize's.
+        """
+        if self.async_clients is None:
+            yield await self.local.summarize(url, text)
+            return
+
+        request = {**self._summary_request(text, context), "stream": True, "stream_options": {"include_usage": True}}
+        parts = []
+        usage = None
+        ttft = None
+        async with self.limiter:
+            started = time.perf_counter()
+            try:
+                stream = await self.async_clients.get().chat.completions.create(**request)
+                async for chunk in stream:
+                    if getattr(chunk, "usage", None):
+                        usage = chunk.usage
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        if ttft is None:
+                            ttft = time.perf_counter() - started
+                        parts.append(delta)
+                        yield delta
+            except openai.RateLimitError as e:
+                self.limiter.on_rate_limited(retry_after_seconds(e))
+                raise SummaryError(f"LLM stream rate limited: {e}", retryable=True) from e
+            except openai.OpenAIError as e:
+                self.limiter.on_error()
+                raise SummaryError(f"LLM stream failed: {e}") from e
+            latency = time.perf_counter() - started
+            self.limiter.on_success(latency, key=(request["model"], "stream"))
+            self._record(request["model"], latency, usage, ttft=ttft)
+
+        summary = "".join(parts).strip()
+        if summary:
+            self.cache.set(SummaryCache.make_key(self.model, PROMPT_TEMPLATE_VERSION, text), summary)
+
+    async def asummarize_batch(self, items: List[dict], model: str = None) -> List[Optional[str]]:
+        """
+        Async generate_summaries (on `model`, default OPENAI_MODEL). Items whose LLM summary
+        failed permanently get an offline extractive summary instead. None for items whose
+        summary failed with a retryable error (not to be stored, so the next run asks the
+        LLM again) or that have no text to summarize.
+        """
+        model = model or self.model
+
+        async def single(item):
+            try:
+                return await self.asummarize(item["text"], item.get("context", ""), url=item.get("url"), model=model)
+            except SummaryError as e:
+                if e.retryable:
+                    logger.warning(f"Summary of {item.get('url')} postponed to the next run: {e}")
+                    return None
+                logger.error(f"Summary failed for {item.get('url')}, using extractive summary: {e}")
+                return e
+
+        async def per_item(indexes, summaries):
+            # Permanent failures get their extractive summaries together, in one batch
+            results = await asyncio.gather(*(single(items[idx]) for idx in indexes))
+            failed = [idx for idx, result in zip(indexes, results) if isinstance(result, SummaryError)]
+            for idx, result in zip(indexes, results):
+                summaries[idx] = None if isinstance(result, SummaryError) else result
+            self.fallbacks += len(failed)
+            for idx, summary in zip(failed, await self.local.aextractive_many([items[idx] for idx in failed])):
+                summaries[idx] = summary or None
+            return summaries
+
+        if self.async_clients is None:
+            return await self.local.summarize_many(items)
+        if len(items) == 1:
+            return await per_item([0], [None])
+
+        summaries = [None] * len(items)
+        keys = [SummaryCache.make_key(model, PROMPT_TEMPLATE_VERSION, item["text"]) for item in items]
+        pending = []
+        for idx, key in enumerate(keys):
+            summaries[idx] = self.cache.get(key)
+            if summaries[idx] is None:
+                pending.append(idx)
+
+        if len(pending) > 1:
+            try:
+                response = await self._complete(self._batch_request(items, pending, model), items=len(pending))
+                self._apply_batch_reply(response.choices[0].message.content, pending, keys, summaries)
+            except (SummaryError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Batch summary of {len(pending)} items failed, falling back to per-item calls: {e}")
+
+        return await per_item([idx for idx in pending if summaries[idx] is None], summaries)
+
+    async def asummarize_tiered(self, items: List[dict]) -> List[Optional[str]]:
+        """
+        asummarize_batch by tier: items carry item["tier"] (see summary_tiers). "local" items
+        get an offline extractive summary, "fast" / "strong" items one batch per tier on that
+        tier's model. Without an API key every item takes the local summarizer path.
+        Per tier item counts and latency go to tier_metrics.
+        """
+        if self.async_clients is None:
+            return await self._timed_tier("local", len(items), self.asummarize_batch(items))
+
+        groups = {}
+        for idx, item in enumerate(items):
+            groups.setdefault(item.get("tier", "fast"), []).append(idx)
+
+        async def local(group):
+            summaries = await self.local.aextractive_many(group)
+            return [summary or item["text"] for item, summary in zip(group, summaries)]
+
+        async def run(tier, indexes):
+            group = [items[idx] for idx in indexes]
+            if tier == "local":
+                return await self._timed_tier(tier, len(group), local(group))
+            return await self._timed_tier(tier, len(group), self.asummarize_batch(group, model=self.tier_models[tier]))
+
+        summaries = [None] * len(items)
+        tiers = list(groups.items())
+        results = await asyncio.gather(*(run(tier, indexes) for tier, indexes in tiers))
+        for (tier, indexes), tier_summaries in zip(tiers, results):
+            for idx, summary in zip(indexes, tier_summaries):
+                summaries[idx] = summary
+        return summaries
+
+    @staticmethod
+    async def _timed_tier(tier: str, count: int, summaries):
+        started = time.perf_counter()
+        result = await summaries
+        tier_metrics.record(tier, count, time.perf_counter() - started)
+        return result
+
+    def generate_local_summary(self, url: str, text: str) -> str:
+        """
+        Uses newspaper3k to extract summary locally without LLM (see LocalSummarizer).
+        Sync entry point; must not be called from a running event loop.
+        """
+        async def summarize():
+            try:
+                return await self.local.summarize(url, text)
+            finally:
+                await self.local.aclose()  # the HTTP client of this one-off loop
+        return asyncio.run(summarize())
 
 llm_service = LLMService()
@@ -0,0 +1,220 @@
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+import httpx
+from loguru import logger
+from crawler import DEFAULT_HEADERS
+from extractive import extractive_summarizer
+from loop_local import LoopLocal
+
+# Below this many items extractive_many runs inline (~0.15 ms / item); larger groups go to a thread
+EXTRACTIVE_THREAD_MIN = 16
+
+# Per-process state of the extraction workers (built once by _init_worker)
+_worker_config = None
+
+def _init_worker():
+    """
+    Process pool initializer: builds the newspaper Config once, loads each language's
+    stopwords only once (newspaper re-reads the file on every Article.nlp()) and
+    warms up the jieba dictionary used for Chinese tokenization.
+    """
+    global _worker_config
+    from newspaper import Config, nlp
+
+    _worker_config = Config()
+    _worker_config.browser_user_agent = DEFAULT_HEADERS["User-Agent"]
+    _worker_config.fetch_images = False
+    _worker_config.memoize_articles = False
+
+    loaded = set()
+    load_stopwords = nlp.load_stopwords
+    def load_stopwords_once(language):
+        if language not in loaded:
+            load_stopwords(language)
+            loaded.add(language)
+    nlp.load_stopwords = load_stopwords_once
+
+    try:
+        import jieba
+        jieba.setLogLevel(60)
+        jieba.initialize()
+    except ImportError:
+        pass
+
+def extract_article(url: str, html: str) -> Tuple[str, str]:
+    """
+    CPU-bound part, run in the process pool: parse + NLP of already downloaded HTML.
+    Returns (article text, newspaper summary).
+    """
+    from newspaper import Article, Config
+
+    article = Article(url, config=_worker_config or Config(), language='zh') # Default to zh, auto-detects
+    article.download(input_html=html)
+    article.parse()
+    try:
+        article.nlp()
+    except Exception as e:
+        # e.g. missing NLTK data: keep the extracted text, the caller falls back to it
+        return article.text, ""
+    return article.text, article.summary
+
+def format_local_summary(summary: str, article_text: str, fallback_text: str) -> str:
+    if not summary:
+        # Fallback if NLP fails to extract summary
+        if article_text:
+            summary = article_text[:200] + "..."
+        else:
+            return fallback_text[:150] + "..."
+
+    # Ensure it's not too long
+    if len(summary) > 300:
+        summary = summary[:300] + "..."
+
+    return f"[自动提取] {summary}"
+
+class ArticleCache:
+    """
+    On-disk cache (separate SQLite file) of extracted article text and summary keyed by URL,
+    so articles are downloaded and parsed only once.
+    """
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("ARTICLE_CACHE_PATH", "./article_cache.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS articles ("
+            "url TEXT PRIMARY KEY, text TEXT, summary TEXT, fetched_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            row = self._conn.execute("SELECT text, summary FROM articles WHERE url = ?", (url,)).fetchone()
+        return (row[0] or "", row[1] or "") if row else None
+
+    def set(self, url: str, text: str, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (url, text, summary, fetched_at) VALUES (?, ?, ?, ?)",
+                (url, text, summary, time.time())
+            )
+            self._conn.commit()
+
+class LocalSummarizer:
+    """
+    Summarizer for the no-API-key path.
+    - downloads run concurrently on one pooled httpx.AsyncClient per event loop (closed by aclose())
+    - parse + NLP (CPU-bound) run in a process pool whose workers keep their NLP resources
+    - extracted text / summaries are cached on disk by URL
+    - LOCAL_SUMMARY_MODE=extractive never downloads: it summarizes the crawled description
+      (or previously cached article text) with the offline extractive summarizer
+    """
+    def __init__(self, workers: int = None, max_downloads: int = 8, cache_path: str = None,
+                 transport: httpx.AsyncBaseTransport = None):
+        self.workers = workers or int(os.getenv("LOCAL_SUMMARY_WORKERS", str(os.cpu_count() or 2)))
+        self.max_downloads = max_downloads
+        self.cache = ArticleCache(cache_path)
+        self.transport = transport # Injected in tests (httpx.MockTransport)
+        self.mode = os.getenv("LOCAL_SUMMARY_MODE", "newspaper")
+        self._pool = None
+        # One client (+ download semaphore) per event loop: each pipeline run has its own loop
+        self._http = LoopLocal(self._new_http, close=lambda http: http[0].aclose())
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn, not fork: the pool is created from a scheduler thread of a process that also
+            # runs uvicorn / APScheduler threads, and forking while another thread holds a lock
+            # (loguru, sqlite) can deadlock the child
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _new_http(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        client = httpx.AsyncClient(
+            http2=True,
+            headers=DEFAULT_HEADERS,
+            limits=httpx.Limits(max_connections=self.max_downloads, max_keepalive_connections=self.max_downloads),
+            timeout=10.0,
+            follow_redirects=True,
+            transport=self.transport
+        )
+        return client, asyncio.Semaphore(self.max_downloads)
+
+    async def aclose(self):
+        """
+        Closes the running event loop's HTTP client; every pipeline run calls it before its loop ends.
+        """
+        await self._http.aclose()
+
+    async def summarize(self, url: str, text: str) -> str:
+        if not url:
+            # Fallback to simple truncation if no URL provided
+            return text[:150] + "..." if len(text) > 150 else text
+
+        cached = self.cache.get(url)
+        if cached is not None:
+            article_text, summary = cached
+            return format_local_summary(summary, article_text, text)
+        if self.mode == "extractive":
+            return self.extractive(url, text)
+
+        try:
+            logger.info(f"Generating local summary for: {url}")
+            client, semaphore = self._http.get()
+            async with semaphore:
+                response = await client.get(url)
+            response.raise_for_status()
+
+            loop = asyncio.get_running_loop()
+            article_text, summary = await loop.run_in_executor(self._executor(), extract_article, url, response.text)
+            self.cache.set(url, article_text, summary)
+            return format_local_summary(summary, article_text, text)
+        except Exception as e:
+            logger.warning(f"Local summary generation failed for {url}: {e}")
+            return self.extractive(url, text)
+
+    def extractive(self, url: str, text: str) -> str:
+        """
+        Offline summary of cached article text (if any) or the given text; no HTTP.
+        """
+        summary = extractive_summarizer.summarize(self.cached_text(url) or text)
+        return f"[自动提取] {summary}" if summary else ""
+
+    def extractive_many(self, items: List[dict]) -> List[str]:
+        """
+        extractive() of many items ({"url": ..., "text": ...}) in one summarize_many pass.
+        """
+        texts = [self.cached_text(item.get("url")) or item["text"] for item in items]
+        return [f"[自动提取] {summary}" if summary else "" for summary in extractive_summarizer.summarize_many(texts)]
+
+    async def aextractive_many(self, items: List[dict]) -> List[str]:
+        """
+        extractive_many from a running event loop: groups of EXTRACTIVE_THREAD_MIN items or
+        more are scored in a worker thread so the loop keeps serving other tasks.
+        """
+        if not items:
+            return []
+        if len(items) < EXTRACTIVE_THREAD_MIN:
+            return self.extractive_many(items)
+        return await asyncio.to_thread(self.extractive_many, items)
+
+    async def summarize_many(self, items: List[dict]) -> List[str]:
+        """
+        items: [{"url": ..., "text": ...}]; returns summaries in the same order.
+        """
+        return list(await asyncio.gather(*(self.summarize(item.get("url"), item["text"]) for item in items)))
+
+    def cached_text(self, url: str) -> Optional[str]:
+        cached = self.cache.get(url) if url else None
+        return cached[0] if cached else None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, Dict, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+class LoopLocal(Generic[T]):
+    """
+    One instance of an async resource (HTTP / API client) per asyncio event loop.
+    Each pipeline run has its own loop (asyncio.run in the scheduler thread) while the API
+    serves on uvicorn's loop; pooled connections must not cross loops.
+    get() builds the resource on first use in the running loop; aclose() closes the running
+    loop's instance, from that loop. Instances of loops closed without aclose() are dropped.
+    """
+    def __init__(self, factory: Callable[[], T], close: Optional[Callable[[T], Awaitable]] = None):
+        self.factory = factory
+        self.close = close
+        self._instances: Dict[asyncio.AbstractEventLoop, T] = {}
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            instance = self._instances.get(loop)
+            if instance is None:
+                for stale in [other for other in self._instances if other.is_closed()]:
+                    del self._instances[stale]
+                instance = self._instances[loop] = self.factory()
+            return instance
+
+    async def aclose(self):
+        with self._lock:
+            instance = self._instances.pop(asyncio.get_running_loop(), None)
+        if instance is not None and self.close is not None:
+            await self.close(instance)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._instances)
@@ -1,13 +1,27 @@
-from fastapi import FastAPI, BackgroundTasks, Depends
+from fastapi import FastAPI, BackgroundTasks, Depends, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from database import SessionLocal, init_db, NewsItem
-from processor import process_news
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import AsyncSessionLocal, WriterSession, async_engine, init_db, NewsItem
+from processor import process_news, backfill_popularity
+from sources import SCHEDULES, get_sources
+from typing import List, Optional
+from datetime import datetime
+from response_cache import cached_json_response, response_cache
+from news_queries import PAGE_ORDERS, TOP_ORDERS, news_page_query, split_page, top_per_source_query
+from schemas import DigestResponse, NewsDetail, NewsPage, TopNews
+from digest import DIGEST_EDITION, load_digest
+from latest_news import latest_news
 from services.notification import notification_service
+from llm_service import llm_service, SummaryError
+from llm_metrics import llm_metrics
+from summary_tiers import tier_metrics
+from prompt_builder import prompt_builder
 from loguru import logger
 from apscheduler.schedulers.background import BackgroundScheduler
 from contextlib import asynccontextmanager
 import asyncio
+import json
 from routers import wechat
 
 scheduler = BackgroundScheduler()
@@ -18,11 +32,11 @@ def run_process_and_notify():
     This is a synchronous wrapper for the scheduler.
     """
     try:
-        # 1. Process News
+        # 1. Process News, then materialize today's digest snapshot
         logger.info("Scheduled task: Starting process_news")
-        process_news()
+        process_news(digest_edition=DIGEST_EDITION)
         
-        # 2. Trigger Notification
+        # 2. Trigger Notification (served from the snapshot)
         logger.info("Scheduled task: Starting notification push")
         # Since this runs in a thread, we create a new event loop for async task
         asyncio.run(notification_service.push_daily_digest())
@@ -35,16 +49,25 @@ def run_process_and_notify():
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    backfill_popularity()
+    await asyncio.to_thread(latest_news.refresh)
     
     # Schedule task: Run every day at 8:00 AM
     scheduler.add_job(run_process_and_notify, 'cron', hour=8, minute=0, id='daily_update')
+    
+    # Incremental refreshes: each schedule group only re-crawls its own sources
+    for schedule, minutes in SCHEDULES.items():
+        scheduler.add_job(process_news, 'interval', minutes=minutes, kwargs={"schedule": schedule}, id=f'refresh_{schedule}')
     scheduler.start()
-    logger.info("Scheduler started. Daily update scheduled at 08:00.")
+    logger.info(f"Scheduler started. Daily update scheduled at 08:00, refresh intervals (min): {SCHEDULES}")
     
     yield
     
     # Shutdown
     scheduler.shutdown()
+    llm_service.local.shutdown()
+    await llm_service.aclose()
+    await async_engine.dispose()
     logger.info("Scheduler shut down.")
 
 app = FastAPI(title="AI Daily Feed API", lifespan=lifespan)
@@ -58,49 +81,165 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+MAX_PAGE_SIZE = 300
+
+def resolve_source_names(values: List[str]) -> List[str]:
+    """
+    Maps source keys ('gh') to the names stored in NewsItem.source; names pass through.
+    """
+    names = {source.key: source.name for source in get_sources()}
+    return [names.get(value, value) for value in values]
+
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to AI Daily Feed API"}
 
 @app.post("/api/v1/trigger-update")
-def trigger_update(background_tasks: BackgroundTasks):
+def trigger_update(background_tasks: BackgroundTasks, sources: Optional[List[str]] = Query(None), schedule: Optional[str] = None):
     """
     Manually triggers the news fetching and processing pipeline in the background.
+    Optional: ?sources=gh&sources=hf or ?schedule=fast to refresh only a subset.
     """
-    background_tasks.add_task(process_news)
+    try:
+        get_sources(sources, schedule)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    background_tasks.add_task(process_news, sources=sources, schedule=schedule)
     return {"status": "success", "message": "Update task started in background"}
 
-@app.get("/api/v1/news")
-def get_news(source: str = None, limit: int = 10, db: Session = Depends(get_db)):
+@app.get("/api/v1/news", response_model=NewsPage)
+async def get_news(request: Request, source: str = None, limit: int = Query(10, ge=1, le=MAX_PAGE_SIZE),
+                   cursor: Optional[str] = None, sources: Optional[List[str]] = Query(None),
+                   category: Optional[str] = None, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   order: str = "recent", db: AsyncSession = Depends(get_db)):
     """
-    Get processed news from the database.
-    Optional filter by source: 'GitHub Trending' or 'Hugging Face Daily Papers'
-    Limit defaults to 10 items per source (or total if source specified).
+    Get processed news from the database, newest first, one page at a time.
+    Filters: source / sources (source name like 'GitHub Trending' or key like 'gh', repeatable),
+    category ('Technology', 'Product', 'Other'), since / until (ISO datetimes, UTC if naive).
+    order: 'recent' (newest first) or 'hot' (hotness, comparable across sources).
+    Pass the returned next_cursor as ?cursor= to get the following page (same filters and order).
+    Responses are cached until the next database commit and carry an ETag (If-None-Match -> 304).
     """
-    query = db.query(NewsItem).order_by(NewsItem.created_at.desc())
-    
-    if source:
-        query = query.filter(NewsItem.source == source)
-        items = query.limit(limit).all()
-    else:
-        # If no source specified, we might want to return mixed results, 
-        # or grouped results. For simplicity in this API, let's just return latest `limit` items total.
-        # But user requirement says "Top 10 per platform". 
-        # So maybe we should fetch separately if no source is provided?
-        # Let's support fetching all if no source, but limit total. 
-        # Better approach for UI: UI calls this API multiple times or we group here.
-        # Let's keep it simple: Limit applies to the result set.
-        items = query.limit(limit).all()
-        
-    return {"status": "success", "data": items}
+    if order not in PAGE_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of: {', '.join(PAGE_ORDERS)}")
+    names = resolve_source_names(([source] if source else []) + (sources or []))
+    try:
+        query = news_page_query(limit, cursor=cursor, sources=names, category=category, since=since, until=until,
+                                order=order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def build():
+        items, next_cursor = split_page((await db.scalars(query)).all(), limit, order)
+        return NewsPage(data=items, next_cursor=next_cursor)
+    return await cached_json_response(request, build)
+
+@app.get("/api/v1/news/top", response_model=TopNews)
+async def get_top_news(request: Request, n: int = Query(10, ge=1, le=50), order: str = "recent",
+                       sources: Optional[List[str]] = Query(None), since: Optional[datetime] = None,
+                       db: AsyncSession = Depends(get_db)):
+    """
+    Top n items per source in one query, grouped by source name.
+    order: 'recent' (newest first) or 'popular' (hotness); optional sources / since filters.
+    Cached with an ETag like /api/v1/news.
+    """
+    if order not in TOP_ORDERS:
+        raise HTTPException(status_code=400, detail=f"order must be one of: {', '.join(TOP_ORDERS)}")
+    query = top_per_source_query(n, order, sources=resolve_source_names(sources or []), since=since)
+
+    async def build():
+        grouped = {}
+        for item, rank in (await db.execute(query)).all():
+            grouped.setdefault(item.source, []).append(item)
+        return TopNews(data=grouped)
+    return await cached_json_response(request, build)
+
+@app.get("/api/v1/news/{item_id}", response_model=NewsDetail)
+async def get_news_item(request: Request, item_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    A single news item (same fields as the list entries). Cached with an ETag like /api/v1/news.
+    """
+    async def build():
+        item = await db.get(NewsItem, item_id)
+        if not item:
+            raise HTTPException(status_code=404, detail="News item not found")
+        return NewsDetail(data=item)
+    return await cached_json_response(request, build)
+
+@app.get("/api/v1/digest", response_model=DigestResponse)
+async def get_digest(request: Request, day: Optional[str] = None, edition: str = DIGEST_EDITION,
+                     db: AsyncSession = Depends(get_db)):
+    """
+    The daily digest snapshot (the items pushed to Feishu / WeChat) of `day` (YYYY-MM-DD),
+    or the most recent one. Snapshots are written by the 08:00 run and never change.
+    """
+    async def build():
+        digest = await load_digest(db, day, edition)
+        if not digest:
+            raise HTTPException(status_code=404, detail="Digest not found")
+        return DigestResponse(data=digest)
+    return await cached_json_response(request, build)
+
+def save_summary(item_id: int, summary: str):
+    # Through the dedicated writer connection, like the pipeline's writes
+    db = WriterSession()
+    try:
+        db.query(NewsItem).filter(NewsItem.id == item_id).update({NewsItem.summary: summary})
+        db.commit()
+    finally:
+        db.close()
+    latest_news.refresh_if_dirty()
+
+@app.post("/api/v1/news/{item_id}/resummarize")
+async def resummarize(item_id: int, db: AsyncSession = Depends(get_db)):
+    """
+    Regenerates an item's summary and streams it progressively as Server-Sent Events
+    (data: {"delta": ...}); the final summary is stored and sent as event "done".
+    """
+    item = await db.get(NewsItem, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="News item not found")
+    text, context, url = item.original_desc or item.title, f"Source: {item.source}", item.url
+
+    async def events():
+        parts = []
+        try:
+            async for delta in llm_service.astream_summary(text, context, url=url):
+                parts.append(delta)
+                yield f"data: {json.dumps({'delta': delta}, ensure_ascii=False)}\n\n"
+        except SummaryError as e:
+            yield f"event: error\ndata: {json.dumps({'error': str(e)}, ensure_ascii=False)}\n\n"
+            return
+        summary = "".join(parts).strip()
+        if not summary:
+            # Keep the stored summary rather than overwrite it with nothing
+            yield f"event: error\ndata: {json.dumps({'error': 'LLM returned an empty summary'})}\n\n"
+            return
+        await asyncio.to_thread(save_summary, item_id, summary)
+        yield f"event: done\ndata: {json.dumps({'summary': summary}, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/api/v1/metrics")
+def get_metrics():
+    """
+    Runtime metrics of the processing services.
+    """
+    return {"status": "success", "data": {
+        "summary_cache": llm_service.cache.stats(),
+        "response_cache": response_cache.stats(),
+        "latest_news": latest_news.stats(),
+        "llm_limiter": llm_service.limiter.stats(),
+        "llm_fallbacks": llm_service.fallbacks,
+        "summary_tiers": tier_metrics.snapshot(),
+        "prompt_tokens": prompt_builder.accounting.snapshot(),
+        "llm_calls": llm_metrics.snapshot()
+    }}
 
 @app.post("/api/v1/notify")
 async def trigger_notify(background_tasks: BackgroundTasks):
@@ -0,0 +1,105 @@
+import base64
+import datetime
+import json
+from typing import List, Optional, Tuple
+from sqlalchemy import Select, func, select, tuple_
+from database import NewsItem
+
+# Sort keys (all descending) of the /api/v1/news orders; the cursor holds the key of a page's last item
+PAGE_ORDERS = {
+    "recent": ("created_at", "id"),
+    "hot": ("hotness", "created_at", "id"),
+}
+
+def encode_cursor(item: NewsItem, order: str = "recent") -> str:
+    """
+    Opaque cursor of the last item of a page: the order and its sort key.
+    """
+    key = [getattr(item, name) for name in PAGE_ORDERS[order]]
+    raw = json.dumps([order] + [value.isoformat() if isinstance(value, datetime.datetime) else value for value in key])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, order: str = "recent") -> list:
+    """
+    Raises ValueError on a malformed cursor or one from another order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_order, *key = json.loads(raw)
+        if cursor_order != order or len(key) != len(PAGE_ORDERS[order]):
+            raise ValueError("cursor of another order")
+        return [
+            datetime.datetime.fromisoformat(value) if name == "created_at" else int(value)
+            for name, value in zip(PAGE_ORDERS[order], key)
+        ]
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def _naive_utc(value: datetime.datetime) -> datetime.datetime:
+    # created_at is stored as naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
+
+def news_page_query(limit: int, cursor: Optional[str] = None, sources: Optional[List[str]] = None,
+                    category: Optional[str] = None, since: Optional[datetime.datetime] = None,
+                    until: Optional[datetime.datetime] = None, order: str = "recent") -> Select:
+    """
+    Newest ("recent") or hottest ("hot") first, keyset-paginated on the order's sort key:
+    the page after `cursor` is read straight from the matching index (ix_news_items_created_at_id,
+    _source_recent, _hot, _source_hot) instead of skipping rows with OFFSET.
+    Selects limit + 1 rows; the extra one only tells whether there is a next page.
+    """
+    columns = [getattr(NewsItem, name) for name in PAGE_ORDERS[order]]
+    query = select(NewsItem).order_by(*(column.desc() for column in columns))
+    if cursor:
+        query = query.where(tuple_(*columns) < tuple_(*decode_cursor(cursor, order)))
+    if sources:
+        query = query.where(NewsItem.source.in_(sources))
+    if category:
+        query = query.where(NewsItem.category == category)
+    if since:
+        query = query.where(NewsItem.created_at >= _naive_utc(since))
+    if until:
+        query = query.where(NewsItem.created_at < _naive_utc(until))
+    return query.limit(limit + 1)
+
+def split_page(rows: list, limit: int, order: str = "recent") -> Tuple[list, Optional[str]]:
+    """
+    Returns (page items, cursor of the next page or None).
+    """
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(rows[limit - 1], order)
+    return rows, None
+
+TOP_ORDERS = ("recent", "popular")
+
+def top_per_source_query(n: int, order: str = "recent", sources: Optional[List[str]] = None,
+                         since: Optional[datetime.datetime] = None) -> Select:
+    """
+    The top `n` items of every source in one query: ROW_NUMBER() OVER (PARTITION BY source
+    ORDER BY ...) in a subquery, joined back to news_items and cut at rank <= n.
+    Selects (NewsItem, rank) ordered by source, rank. The windows are read in order from the
+    covering ix_news_items_source_recent / ix_news_items_source_hot.
+    """
+    if order == "popular":
+        ordering = (NewsItem.hotness.desc(), NewsItem.created_at.desc(), NewsItem.id.desc())
+    else:
+        ordering = (NewsItem.created_at.desc(), NewsItem.id.desc())
+
+    ranked = select(
+        NewsItem.id,
+        func.row_number().over(partition_by=NewsItem.source, order_by=ordering).label("rank")
+    )
+    if sources:
+        ranked = ranked.where(NewsItem.source.in_(sources))
+    if since:
+        ranked = ranked.where(NewsItem.created_at >= _naive_utc(since))
+    ranked = ranked.subquery()
+
+    return (
+        select(NewsItem, ranked.c.rank)
+        .join(ranked, NewsItem.id == ranked.c.id)
+        .where(ranked.c.rank <= n)
+        .order_by(NewsItem.source, ranked.c.rank)
+    )
@@ -0,0 +1,274 @@
+import os
+from abc import ABC, abstractmethod
+from typing import List
+import lxml.html
+from lxml.cssselect import CSSSelector
+from bs4 import BeautifulSoup
+from loguru import logger
+
+class ParserBackend(ABC):
+    """
+    HTML -> item dicts for the scraped sources.
+    Every backend must return exactly the same items for the same HTML; a backend missing
+    a method cannot be instantiated.
+    """
+    name = ""
+
+    @abstractmethod
+    def github_trending(self, html: str) -> List[dict]: ...
+
+    @abstractmethod
+    def huggingface_papers(self, html: str) -> List[dict]: ...
+
+    @abstractmethod
+    def qbitai(self, html: str) -> List[dict]: ...
+
+class LxmlParser(ParserBackend):
+    """
+    Default backend: plain lxml tree + CSS selectors compiled to XPath once at import.
+    No BeautifulSoup tree is built and every lookup is a precompiled XPath evaluation.
+    """
+    name = "lxml"
+
+    _html_parser = lxml.html.HTMLParser(encoding="utf-8")
+
+    # GitHub Trending
+    _gh_articles = CSSSelector("article.Box-row")
+    _gh_title = CSSSelector("h2 a")
+    _gh_desc = CSSSelector("p")
+    _gh_stats = CSSSelector("div.f6")
+    _gh_stars = CSSSelector("a[href$='/stargazers']")
+
+    # Hugging Face Daily Papers
+    _hf_articles = CSSSelector("article")
+    _hf_title = CSSSelector("h3")
+    _hf_link = CSSSelector("a")
+    _hf_upvotes = CSSSelector("div.leading-none")
+    _hf_img = CSSSelector("img")
+
+    # QbitAI: iterate the .text_box containers so the intro is found without walking up the tree
+    _qbit_boxes = CSSSelector(".text_box")
+    _qbit_links = CSSSelector("h4 a")
+    _qbit_intro = CSSSelector("p.intro")
+
+    def _root(self, html: str):
+        if not html or not html.strip():
+            return None
+        return lxml.html.fromstring(html.encode("utf-8"), parser=self._html_parser)
+
+    @staticmethod
+    def _first(selector, element):
+        found = selector(element)
+        return found[0] if found else None
+
+    def github_trending(self, html: str) -> List[dict]:
+        root = self._root(html)
+        if root is None:
+            return []
+        repos = []
+        for article in self._gh_articles(root):
+            title_tag = self._first(self._gh_title, article)
+            if title_tag is None:
+                continue
+
+            desc_tag = self._first(self._gh_desc, article)
+            stars = "0"
+            stats = self._first(self._gh_stats, article)
+            if stats is not None:
+                star_link = self._first(self._gh_stars, stats)
+                if star_link is not None:
+                    stars = star_link.text_content().strip()
+
+            repos.append({
+                "title": title_tag.text_content().strip().replace("\n", "").replace(" ", ""),
+                "url": "https://github.com" + title_tag.get("href", ""),
+                "description": desc_tag.text_content().strip() if desc_tag is not None else "No description",
+                "stars": stars,
+                "source": "GitHub Trending"
+            })
+        return repos
+
+    def huggingface_papers(self, html: str) -> List[dict]:
+        root = self._root(html)
+        if root is None:
+            return []
+        papers = []
+        for article in self._hf_articles(root):
+            title_tag = self._first(self._hf_title, article)
+            if title_tag is None:
+                continue
+
+            link_tag = self._first(self._hf_link, article)
+            upvote_tag = self._first(self._hf_upvotes, article)
+            img_tag = self._first(self._hf_img, article)
+
+            papers.append({
+                "title": title_tag.text_content().strip(),
+                "url": "https://huggingface.co" + link_tag.get("href", "") if link_tag is not None else "",
+                "upvotes": upvote_tag.text_content().strip() if upvote_tag is not None else "0",
+                "thumbnail": img_tag.get("src", "") if img_tag is not None else "",
+                "source": "Hugging Face Daily Papers"
+            })
+        return papers
+
+    def qbitai(self, html: str) -> List[dict]:
+        root = self._root(html)
+        if root is None:
+            return []
+        articles = []
+        for box in self._qbit_boxes(root):
+            intro = None
+            for link in self._qbit_links(box):
+                title = link.text_content().strip()
+                href = link.get("href")
+                if not title or not href: continue
+
+                if intro is None:
+                    intro_tag = self._first(self._qbit_intro, box)
+                    intro = intro_tag.text_content().strip() if intro_tag is not None else ""
+
+                articles.append({
+                    "title": title,
+                    "url": href,
+                    "description": intro or title,
+                    "upvotes": None,
+                    "thumbnail": None,
+                    "source": "QbitAI"
+                })
+        return articles
+
+class SoupParser(ParserBackend):
+    """
+    Original BeautifulSoup implementation, kept as a reference / fallback backend.
+    """
+    name = "bs4"
+
+    def github_trending(self, html: str) -> List[dict]:
+        soup = BeautifulSoup(html, "lxml")
+        repos = []
+
+        # GitHub trending structure (subject to change by GitHub)
+        # Each repo is in an <article class="Box-row">
+        articles = soup.select("article.Box-row")
+
+        for article in articles:
+            # Title: h2 a -> href (link), text (owner/repo)
+            title_tag = article.select_one("h2 a")
+            if not title_tag:
+                continue
+
+            repo_name = title_tag.text.strip().replace("\n", "").replace(" ", "")
+            repo_url = "https://github.com" + title_tag.get("href", "")
+
+            # Description: p
+            desc_tag = article.select_one("p")
+            description = desc_tag.text.strip() if desc_tag else "No description"
+
+            # Stars:
+            # span with octicon-star -> parent text
+            # Usually in the footer
+            stats = article.select_one("div.f6")
+            stars = "0"
+            if stats:
+                star_link = stats.select_one("a[href$='/stargazers']")
+                if star_link:
+                    stars = star_link.text.strip()
+
+            repos.append({
+                "title": repo_name,
+                "url": repo_url,
+                "description": description,
+                "stars": stars,
+                "source": "GitHub Trending"
+            })
+        return repos
+
+    def huggingface_papers(self, html: str) -> List[dict]:
+        soup = BeautifulSoup(html, "lxml")
+        papers = []
+
+        # Each paper is usually in an article tag or div with specific classes
+        # Currently (as of late 2024/early 2025), structure might be:
+        # article.flex.flex-col
+        # Let's try to find articles that look like papers
+
+        articles = soup.select("article")
+
+        for article in articles:
+            # Title is usually in an h3
+            title_tag = article.select_one("h3")
+            if not title_tag:
+                continue
+
+            title = title_tag.text.strip()
+            link_tag = article.select_one("a")
+            paper_url = "https://huggingface.co" + link_tag.get("href", "") if link_tag else ""
+
+            # Upvotes
+            upvote_tag = article.select_one("div.leading-none")
+            upvotes = upvote_tag.text.strip() if upvote_tag else "0"
+
+            # Thumbnail (optional)
+            img_tag = article.select_one("img")
+            thumbnail = img_tag.get("src", "") if img_tag else ""
+
+            papers.append({
+                "title": title,
+                "url": paper_url,
+                "upvotes": upvotes,
+                "thumbnail": thumbnail,
+                "source": "Hugging Face Daily Papers"
+            })
+        return papers
+
+    def qbitai(self, html: str) -> List[dict]:
+        soup = BeautifulSoup(html, "lxml")
+        articles = []
+
+        # QbitAI structure: .text_box h4 a
+        titles = soup.select(".text_box h4 a")
+
+        for link in titles:
+            title = link.text.strip()
+            href = link.get("href")
+
+            if not title or not href: continue
+
+            # Get description if possible (p.intro)
+            text_box = link.find_parent(class_="text_box")
+            desc_tag = text_box.find("p", class_="intro") if text_box else None
+            # An empty intro falls back to the title, like a missing one
+            desc = (desc_tag.text.strip() if desc_tag else "") or title
+
+            # Get thumbnail (img in sibling .picture)
+            # Structure: div.picture > a > img
+            # Need to go up to .item_inner then down to .picture
+            # This is complex, let's skip thumb or try simple search
+            thumbnail = None
+
+            articles.append({
+                "title": title,
+                "url": href,
+                "description": desc,
+                "upvotes": None,
+                "thumbnail": thumbnail,
+                "source": "QbitAI"
+            })
+        return articles
+
+PARSER_BACKENDS = {
+    LxmlParser.name: LxmlParser,
+    SoupParser.name: SoupParser,
+}
+
+def get_parser(name: str = None) -> ParserBackend:
+    """
+    Returns the parser backend by name (default: CRAWLER_PARSER env var, then lxml).
+    """
+    name = name or os.getenv("CRAWLER_PARSER", LxmlParser.name)
+    if name not in PARSER_BACKENDS:
+        logger.warning(f"Unknown CRAWLER_PARSER '{name}', falling back to lxml")
+        name = LxmlParser.name
+    return PARSER_BACKENDS[name]()
+
+html_parser = get_parser()
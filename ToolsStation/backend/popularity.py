@@ -0,0 +1,46 @@
+import math
+import re
+from typing import Optional
+
+_COUNT = re.compile(r"([\d.]+)\s*([kKmMwW万]?)")
+_MULTIPLIERS = {"k": 1_000, "m": 1_000_000, "w": 10_000, "万": 10_000}
+
+# Hotness of an item whose count equals its source's popularity_scale
+HOTNESS_AT_SCALE = 1000
+
+def parse_count(value) -> int:
+    """
+    Parses scraped popularity counts: 1234, "1,234", "12.3k", "1.2万", None.
+    """
+    if value is None:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _COUNT.search(str(value).replace(",", ""))
+    if not match:
+        return 0
+    try:
+        number = float(match.group(1))
+    except ValueError:
+        return 0
+    return int(number * _MULTIPLIERS.get(match.group(2).lower(), 1))
+
+def hotness_score(count: Optional[int], scale: Optional[int]) -> int:
+    """
+    Cross-source hotness: log-scaled count relative to the source's typical high count
+    (Source.popularity_scale), so a count equal to its source's scale scores HOTNESS_AT_SCALE
+    whatever the source: with the registered scales, 5k GitHub stars and 1k Reddit upvotes
+    rank alike. 0 without a count or scale.
+    """
+    if not count or not scale:
+        return 0
+    return int(round(HOTNESS_AT_SCALE * math.log1p(count) / math.log1p(scale)))
+
+def popularity_fields(stars, upvotes, scale: Optional[int]) -> dict:
+    """
+    Integer NewsItem popularity columns from the raw stars / upvotes strings.
+    """
+    stars_count = parse_count(stars) if stars is not None else None
+    upvotes_count = parse_count(upvotes) if upvotes is not None else None
+    count = stars_count if stars_count is not None else upvotes_count
+    return {"stars_count": stars_count, "upvotes_count": upvotes_count, "hotness": hotness_score(count, scale)}
@@ -1,10 +1,24 @@
-import concurrent.futures
-from sqlalchemy.orm import Session
-from database import SessionLocal, NewsItem
-from crawler import fetch_github_trending, fetch_huggingface_daily_papers, fetch_juejin_ai_trending, fetch_reddit_ml_hot, fetch_qbitai_news
+import asyncio
+import threading
+import time
+from typing import List, Optional
+from sqlalchemy import func, or_, update
+from database import SessionLocal, WriterSession, NewsItem, writer_engine
+from crawler import CrawlerEngine
+from http_cache import ValidatorCache
+from fingerprints import FingerprintStore
+from sources import get_sources
+from popularity import popularity_fields
+from digest import materialize_digest
+from latest_news import latest_news
 from llm_service import llm_service
+from llm_metrics import llm_metrics
+from prompt_builder import prompt_builder
 from loguru import logger
 
+# Scheduled runs (fast / hourly / daily) and manual triggers may overlap; they write the same URLs
+_run_lock = threading.Lock()
+
 def determine_category(title: str, description: str) -> str:
     """
     Classify news into: 'Product', 'Technology', 'Other' based on keywords.
@@ -83,114 +97,297 @@ def process_single_item(item_data, db):
         logger.error(f"Error processing item {item_data.get('title')}: {e}")
         return 0
 
-def process_news():
+# Streaming pipeline tuning
+SUMMARY_BATCH_SIZE = 8     # max items packed into one LLM request
+QUEUE_SIZE = 50            # bound of each inter-stage queue (backpressure)
+PERSIST_BATCH_SIZE = 20    # max items per write transaction
+UPSERT_CHUNK_SIZE = 100    # rows per INSERT ... ON CONFLICT statement (stays below SQLite's variable limit)
+
+_DONE = object()  # end-of-stream marker passed through the queues
+
+POPULARITY_FIELDS = ("stars_count", "upvotes_count", "hotness")
+
+NEWS_ITEM_FIELDS = ("title", "url", "source", "original_desc", "summary", "category", "stars", "upvotes", "thumbnail") \
+    + POPULARITY_FIELDS
+
+# Columns sent for existing items; title/source are only used if the row vanished meanwhile
+STATS_ROW_FIELDS = ("url", "title", "source", "stars", "upvotes", "thumbnail") + POPULARITY_FIELDS
+
+def find_existing_urls(urls: List[str]) -> set:
     """
-    Fetches news, checks for duplicates, generates summaries, and saves to DB.
-    Uses ThreadPoolExecutor for parallel processing.
+    Returns the subset of urls already stored in news_items.
     """
+    if not urls:
+        return set()
+    db = SessionLocal()
     try:
-        logger.info("Starting news processing...")
-        
-        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
-            future_gh = executor.submit(fetch_github_trending)
-            future_hf = executor.submit(fetch_huggingface_daily_papers)
-            future_jj = executor.submit(fetch_juejin_ai_trending)
-            future_rd = executor.submit(fetch_reddit_ml_hot)
-            future_qbit = executor.submit(fetch_qbitai_news)
-            
-            # Collect results safely
-            results = {}
-            for future, name in [(future_gh, "gh"), (future_hf, "hf"), (future_jj, "jj"), 
-                                 (future_rd, "rd"), (future_qbit, "qbit")]:
-                try:
-                    results[name] = future.result()
-                except Exception as e:
-                    logger.error(f"Error in crawler {name}: {e}")
-                    results[name] = []
-        
-        all_items = []
-        
-        # Helper to add items
-        def add_items(items, source_name):
-            for item in items:
-                all_items.append({
-                    "title": item["title"],
-                    "url": item["url"],
-                    "source": source_name,
-                    "original_desc": item.get("description", item.get("title", "")),
-                    "stars": item.get("stars"),
-                    "upvotes": item.get("upvotes"),
-                    "thumbnail": item.get("thumbnail")
-                })
-
-        add_items(results["gh"], "GitHub Trending")
-        add_items(results["hf"], "Hugging Face Daily Papers")
-        add_items(results["jj"], "Juejin AI")
-        add_items(results["rd"], "Reddit ML")
-        add_items(results["qbit"], "QbitAI")
-            
-        logger.info(f"Total items fetched: {len(all_items)}")
-        
-        # 2. Process Items (Summary generation is slow, so parallelize it)
-        # However, DB writes must be careful.
-        # Strategy: 
-        #   - Check DB for existing URLs (Main thread)
-        #   - Filter out new items
-        #   - Generate summaries for new items (Parallel)
-        #   - Write new items to DB (Main thread)
-        
-        db: Session = SessionLocal()
-        existing_urls = set(url for url, in db.query(NewsItem.url).all())
-        
-        new_items_data = []
-        updated_count = 0
-        
-        for item in all_items:
-            if item["url"] in existing_urls:
-                # Ideally update stats here, but for batch performance we skip or do bulk update later
-                # For simplicity, let's just count it
-                updated_count += 1
-            else:
-                new_items_data.append(item)
-        
-        logger.info(f"New items to process: {len(new_items_data)}")
-        
-        # Parallel Summary Generation
-        def generate_summary_wrapper(item):
-            context = f"Source: {item['source']}"
-            summary = llm_service.generate_summary(item["original_desc"], context, url=item["url"])
-            item["summary"] = summary
-            return item
+        return set(url for url, in db.query(NewsItem.url).filter(NewsItem.url.in_(urls)).all())
+    finally:
+        db.close()
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-            # Map returns iterator in order
-            processed_new_items = list(executor.map(generate_summary_wrapper, new_items_data))
-            
-        # Write to DB
-        for item in processed_new_items:
-            new_item = NewsItem(
-                title=item["title"],
-                url=item["url"],
-                source=item["source"],
-                original_desc=item["original_desc"],
-                summary=item["summary"],
-                stars=item["stars"],
-                upvotes=item["upvotes"],
-                thumbnail=item["thumbnail"]
+def bulk_upsert_stats(rows: List[dict]) -> int:
+    """
+    Refreshes stars / upvotes / thumbnail of already stored items with chunked
+    INSERT ... ON CONFLICT(url) DO UPDATE statements (SQLite >= 3.24 and PostgreSQL)
+    instead of one query + update round trip per row.
+    A missing thumbnail in the new crawl keeps the stored one.
+    """
+    if not rows:
+        return 0
+    if writer_engine.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    db = WriterSession()
+    try:
+        for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = insert(NewsItem).values(rows[start:start + UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[NewsItem.url],
+                set_={
+                    "stars": stmt.excluded.stars,
+                    "upvotes": stmt.excluded.upvotes,
+                    **{field: stmt.excluded[field] for field in POPULARITY_FIELDS},
+                    "thumbnail": func.coalesce(stmt.excluded.thumbnail, NewsItem.thumbnail),
+                }
             )
-            db.add(new_item)
-            
+            db.execute(stmt)
         db.commit()
+        return len(rows)
+    finally:
         db.close()
-        
-        logger.info(f"Processing complete. New: {len(processed_new_items)}, Updated/Skipped: {updated_count}")
-        return {"new": len(processed_new_items), "updated": updated_count}
-        
-    except Exception as e:
-        logger.error(f"Error in processing pipeline: {e}")
-        raise e
+
+def backfill_popularity() -> int:
+    """
+    Fills the integer popularity columns of rows stored before they existed.
+    """
+    scales = {source.name: source.popularity_scale for source in get_sources()}
+    db = WriterSession()
+    try:
+        rows = db.query(NewsItem.id, NewsItem.source, NewsItem.stars, NewsItem.upvotes).filter(
+            NewsItem.stars_count.is_(None), NewsItem.upvotes_count.is_(None),
+            or_(NewsItem.stars.isnot(None), NewsItem.upvotes.isnot(None))
+        ).all()
+        if rows:
+            db.execute(update(NewsItem), [
+                {"id": item_id, **popularity_fields(stars, upvotes, scales.get(source))}
+                for item_id, source, stars, upvotes in rows
+            ])
+            db.commit()
+            logger.info(f"Backfilled popularity of {len(rows)} items")
+        return len(rows)
+    finally:
+        db.close()
+
+class NewsPipeline:
+    """
+    Streaming crawl -> normalize -> dedup -> summarize -> persist pipeline.
+    Stages are connected by bounded asyncio queues: each source's items move on as soon
+    as that source has been fetched, so a slow source only delays itself, and a full
+    queue blocks its producer (backpressure). Items are committed in small batches.
+    """
+    def __init__(self, sources):
+        self.sources = sources
+        self.summarize_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.persist_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.seen_urls = set()
+        self.stats = {"new": 0, "updated": 0, "summary_failed": 0, "fetched": {}, "not_modified": [], "unchanged": [],
+                      "tiers": {}}
+        self.started_at = None
+
+    async def run(self) -> dict:
+        try:
+            return await self._run()
+        finally:
+            # The LLM / download clients of this run's event loop die with it (asyncio.run)
+            await llm_service.aclose()
+
+    async def _run(self) -> dict:
+        self.started_at = time.perf_counter()
+        prompt_before, usage_before = prompt_builder.accounting.snapshot(), llm_metrics.token_totals()
+        self.validators, self.fingerprints = await asyncio.gather(
+            asyncio.to_thread(ValidatorCache.load),
+            asyncio.to_thread(FingerprintStore.load)
+        )
+
+        async with CrawlerEngine(validators=self.validators) as engine:
+            stages = [
+                asyncio.create_task(self._crawl_stage(engine)),
+                asyncio.create_task(self._summarize_stage()),
+                asyncio.create_task(self._persist_stage()),
+            ]
+            try:
+                await asyncio.gather(*stages)
+            except Exception:
+                # One stage failed: stop the others instead of leaving them blocked on a queue
+                for stage in stages:
+                    stage.cancel()
+                raise
+
+        # Only remember validators / fingerprints once the items behind them are stored
+        await asyncio.to_thread(self.validators.save)
+        await asyncio.to_thread(self.fingerprints.save)
+
+        # Runs are serialized (_run_lock), so the difference of the running totals is this run's
+        usage = llm_metrics.token_totals()
+        self.stats["tokens"] = {
+            **prompt_builder.accounting.since(prompt_before),
+            **{f"api_{key}": usage[key] - usage_before[key] for key in usage},
+        }
+        self.stats["elapsed_seconds"] = round(time.perf_counter() - self.started_at, 2)
+        return self.stats
+
+    # 1. Crawl + normalize + dedup
+    async def _crawl_stage(self, engine: CrawlerEngine):
+        async for source, result in engine.iter_results(self.sources):
+            await self._ingest(source, result)
+        await self.summarize_queue.put(_DONE)
+
+    async def _ingest(self, source, result):
+        if result.not_modified:
+            self.stats["not_modified"].append(source.key)
+            return
+        # Sources whose body / items are identical to the last processed crawl are skipped
+        # before dedup and summarization
+        if result.items and self.fingerprints.check(source.key, result.body_hash, result.items):
+            self.stats["unchanged"].append(source.key)
+            return
+
+        self.stats["fetched"][source.key] = len(result.items)
+        items = [self._normalize(source, item) for item in result.items]
+        existing = await asyncio.to_thread(find_existing_urls, [item["url"] for item in items])
+
+        stats_rows = []
+        for item in items:
+            if item["url"] in self.seen_urls:
+                continue
+            self.seen_urls.add(item["url"])
+            if item["url"] in existing:
+                stats_rows.append({key: item[key] for key in STATS_ROW_FIELDS})
+            else:
+                await self.summarize_queue.put(item)
+
+        # Existing items only get their popularity stats refreshed, in one upsert per chunk
+        self.stats["updated"] += await asyncio.to_thread(bulk_upsert_stats, stats_rows)
+        logger.info(f"{source.key}: {len(items)} items fetched, {len(items) - len(existing)} queued for summary")
+
+    @staticmethod
+    def _normalize(source, item: dict) -> dict:
+        original_desc = item.get("description", item.get("title", ""))
+        return {
+            "title": item["title"],
+            "url": item["url"],
+            "source": source.name,
+            "source_key": source.key,
+            "original_desc": original_desc,
+            "category": determine_category(item["title"], original_desc or ""),
+            "tier": source.summary_tiers.choose(original_desc, item.get("stars") or item.get("upvotes")),
+            "stars": item.get("stars"),
+            "upvotes": item.get("upvotes"),
+            "thumbnail": item.get("thumbnail"),
+            **popularity_fields(item.get("stars"), item.get("upvotes"), source.popularity_scale),
+        }
+
+    # 2. Summarize: the dispatcher packs whatever is already queued (up to a batch) into one
+    #    request and keeps at most as many requests in flight as the LLM service's adaptive
+    #    limit allows, so batches grow when the provider is the bottleneck
+    async def _summarize_stage(self):
+        in_flight = set()
+        done = False
+        while not done:
+            while len(in_flight) >= llm_service.limiter.current_limit:
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    task.result()  # surface unexpected errors
+
+            batch = [await self.summarize_queue.get()]
+            while len(batch) < SUMMARY_BATCH_SIZE and not self.summarize_queue.empty():
+                batch.append(self.summarize_queue.get_nowait())
+            if batch[-1] is _DONE:
+                batch.pop()
+                done = True
+            if batch:
+                in_flight.add(asyncio.create_task(self._summarize_batch(batch)))
+
+        await asyncio.gather(*in_flight)
+        await self.persist_queue.put(_DONE)
+
+    async def _summarize_batch(self, batch: List[dict]):
+        summaries = await llm_service.asummarize_tiered([
+            {"text": item["original_desc"], "context": f"Source: {item['source']}", "url": item["url"], "tier": item["tier"]}
+            for item in batch
+        ])
+        for item in batch:
+            self.stats["tiers"][item["tier"]] = self.stats["tiers"].get(item["tier"], 0) + 1
+        for item, summary in zip(batch, summaries):
+            if summary is None:
+                # No summary (LLM unavailable after retries, or nothing to summarize): not stored,
+                # so the item is new again next run; the source must not be marked as
+                # unchanged / not modified meanwhile
+                self.stats["summary_failed"] += 1
+                self.validators.discard(item["source_key"])
+                self.fingerprints.discard(item["source_key"])
+                continue
+            item["summary"] = summary
+            await self.persist_queue.put(item)
+
+    # 3. Persist in short batched transactions: whatever is already queued (up to a batch)
+    #    is written together, so batches grow under load without delaying a lone item
+    async def _persist_stage(self):
+        done = False
+        while not done:
+            batch = [await self.persist_queue.get()]
+            while len(batch) < PERSIST_BATCH_SIZE and not self.persist_queue.empty():
+                batch.append(self.persist_queue.get_nowait())
+            if batch[-1] is _DONE:
+                batch.pop()
+                done = True
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[dict]):
+        if not batch:
+            return
+        await asyncio.to_thread(self._write_batch, batch)
+        if self.stats["new"] == 0:
+            self.stats["first_item_seconds"] = round(time.perf_counter() - self.started_at, 2)
+            logger.info(f"First items stored after {self.stats['first_item_seconds']}s")
+        self.stats["new"] += len(batch)
+
+    @staticmethod
+    def _write_batch(batch: List[dict]):
+        db = WriterSession()
+        try:
+            db.add_all([NewsItem(**{key: item[key] for key in NEWS_ITEM_FIELDS}) for item in batch])
+            db.commit()
+        finally:
+            db.close()
+
+def process_news(sources: Optional[List[str]] = None, schedule: Optional[str] = None,
+                 digest_edition: Optional[str] = None):
+    """
+    Fetches news, checks for duplicates, generates summaries, and saves to DB.
+    Runs the streaming NewsPipeline on a fresh event loop.
+    :param sources: restrict the run to these source keys (default: all registered)
+    :param schedule: restrict the run to one schedule group, e.g. "fast"
+    :param digest_edition: afterwards materialize today's digest snapshot of this edition, e.g. "daily"
+    """
+    selected = get_sources(sources, schedule)
+    with _run_lock:
+        try:
+            logger.info(f"Starting news processing for: {', '.join(s.key for s in selected)}")
+            stats = asyncio.run(NewsPipeline(selected).run())
+            if digest_edition:
+                stats["digest"] = materialize_digest(edition=digest_edition) is not None
+            latest_news.refresh_if_dirty()  # once per run, however many batches were committed
+            logger.info(f"Processing complete: {stats}")
+            return stats
+        except Exception as e:
+            logger.error(f"Error in processing pipeline: {e}")
+            raise e
 
 if __name__ == "__main__":
     from database import init_db
     init_db()
+    backfill_popularity()
     process_news()
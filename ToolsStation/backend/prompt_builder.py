@@ -0,0 +1,168 @@
+import json
+import math
+import os
+import re
+import threading
+from typing import List, Tuple
+from loguru import logger
+
+SYSTEM_PROMPT = "You are a helpful AI assistant that summarizes tech news into Chinese."
+
+# Instructions live in the system message and never contain per-item data, so every request
+# starts with the same tokens and providers with prefix caching can reuse them
+SUMMARY_INSTRUCTIONS = (
+    "Summarize the content of the user message into a concise Chinese summary (around 100-150 words). "
+    "The content is about AI/Technology. Reply with the summary only."
+)
+
+BATCH_INSTRUCTIONS = (
+    "Summarize each item of the user message into a concise Chinese summary (around 100-150 words). "
+    "The items are about AI/Technology. The user message is a JSON list of "
+    '{"id": ..., "context": ..., "content": ...} objects. Reply with JSON only, in the form '
+    '{"summaries": [{"id": "<item id>", "summary": "<Chinese summary>"}]}, one entry per item.'
+)
+
+_TOKEN = re.compile(r"[一-鿿]|[A-Za-z]+|\d+|\S")
+_SENTENCE_END = "。！？!?.\n"
+
+class HeuristicTokenizer:
+    """
+    Dependency-free token estimate close to BPE counts: one token per CJK character,
+    about four letters (three digits) per token for latin runs, one per other symbol.
+    """
+    name = "heuristic"
+
+    @staticmethod
+    def _cost(piece: str) -> int:
+        if piece.isascii() and piece.isalpha():
+            return max(1, math.ceil(len(piece) / 4))
+        if piece.isdigit():
+            return max(1, math.ceil(len(piece) / 3))
+        return 1
+
+    def count(self, text: str) -> int:
+        return sum(self._cost(m.group()) for m in _TOKEN.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        used = 0
+        for m in _TOKEN.finditer(text):
+            used += self._cost(m.group())
+            if used > max_tokens:
+                return text[:m.start()]
+        return text
+
+class TiktokenTokenizer:
+    name = "tiktoken"
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        tokens = self.encoding.encode(text)
+        return text if len(tokens) <= max_tokens else self.encoding.decode(tokens[:max_tokens])
+
+def get_tokenizer():
+    """
+    tiktoken if installed and its encoding is available locally, else the heuristic.
+    """
+    try:
+        import tiktoken
+        return TiktokenTokenizer(tiktoken.get_encoding(os.getenv("SUMMARY_TOKEN_ENCODING", "cl100k_base")))
+    except Exception as e:
+        logger.debug(f"tiktoken unavailable ({e}), using heuristic token counts")
+        return HeuristicTokenizer()
+
+class TokenAccounting:
+    """
+    Running totals of prompt tokens: content before / after budgeting and the stable prefix.
+    Totals only grow; callers diff two snapshots (see NewsPipeline) to get per-run numbers.
+    """
+    FIELDS = ("requests", "content_tokens_original", "content_tokens_sent", "prefix_tokens", "truncated_items")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = dict.fromkeys(self.FIELDS, 0)
+
+    def add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self._totals[key] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._totals)
+
+    def since(self, before: dict) -> dict:
+        now = self.snapshot()
+        delta = {key: now[key] - before.get(key, 0) for key in self.FIELDS}
+        delta["content_tokens_saved"] = delta["content_tokens_original"] - delta["content_tokens_sent"]
+        return delta
+
+class PromptBuilder:
+    """
+    Builds summary chat messages as [stable system prefix, per-item user message].
+    Item content is whitespace-collapsed and cut to max_content_tokens (at a sentence end
+    when one is close), counted with tiktoken when available, else a heuristic.
+    """
+    def __init__(self, max_content_tokens: int = None, tokenizer=None):
+        self.max_content_tokens = max_content_tokens or int(os.getenv("SUMMARY_MAX_INPUT_TOKENS", "1024"))
+        self.tokenizer = tokenizer or get_tokenizer()
+        self.accounting = TokenAccounting()
+        self.summary_prefix = f"{SYSTEM_PROMPT}\n{SUMMARY_INSTRUCTIONS}"
+        self.batch_prefix = f"{SYSTEM_PROMPT}\n{BATCH_INSTRUCTIONS}"
+        self._prefix_tokens = {
+            self.summary_prefix: self.tokenizer.count(self.summary_prefix),
+            self.batch_prefix: self.tokenizer.count(self.batch_prefix),
+        }
+
+    def fit(self, text: str) -> Tuple[str, int, int]:
+        """
+        Returns (content within budget, original tokens, kept tokens).
+        """
+        content = " ".join((text or "").split())
+        original = self.tokenizer.count(content)
+        if original <= self.max_content_tokens:
+            return content, original, original
+        content = self.tokenizer.truncate(content, self.max_content_tokens)
+        # Prefer ending on a full sentence if that keeps at least 80% of the budget
+        cut = max(content.rfind(mark) for mark in _SENTENCE_END)
+        if cut >= 0 and self.tokenizer.count(content[:cut + 1]) >= 0.8 * self.max_content_tokens:
+            content = content[:cut + 1]
+        else:
+            content += "..."
+        return content, original, self.tokenizer.count(content)
+
+    def summary_messages(self, text: str, context: str = "") -> List[dict]:
+        content, original, kept = self.fit(text)
+        self._account(self.summary_prefix, original, kept, int(kept < original))
+        return [
+            {"role": "system", "content": self.summary_prefix},
+            {"role": "user", "content": f"Context: {context}\nContent: {content}"},
+        ]
+
+    def batch_messages(self, items: List[dict]) -> List[dict]:
+        """
+        items: [{"id": ..., "context": ..., "content": ...}]
+        """
+        original_total = kept_total = truncated = 0
+        batch = []
+        for item in items:
+            content, original, kept = self.fit(item["content"])
+            original_total += original
+            kept_total += kept
+            truncated += int(kept < original)
+            batch.append({**item, "content": content})
+        self._account(self.batch_prefix, original_total, kept_total, truncated)
+        return [
+            {"role": "system", "content": self.batch_prefix},
+            {"role": "user", "content": json.dumps(batch, ensure_ascii=False)},
+        ]
+
+    def _account(self, prefix: str, original: int, kept: int, truncated: int):
+        self.accounting.add(requests=1, content_tokens_original=original, content_tokens_sent=kept,
+                            prefix_tokens=self._prefix_tokens[prefix], truncated_items=truncated)
+
+prompt_builder = PromptBuilder()
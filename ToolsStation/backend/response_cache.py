@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from fastapi import Request, Response
+from database import data_generation
+from schemas import dump_json
+
+class GenerationCache:
+    """
+    In-process LRU cache of values built from the database. An entry is only served while
+    database.data_generation still has the value it was built under, so every commit that
+    changes news items or digest snapshots invalidates everything at once.
+    """
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+        self._entries = OrderedDict()  # key -> (generation, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != data_generation.value:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, generation: int):
+        with self._lock:
+            self._entries[key] = (generation, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get_or_build(self, key, build):
+        """
+        Cached value, or `await build()` stored under the generation read before building
+        (a commit during the build leaves the entry already stale).
+        """
+        value = self.get(key)
+        if value is None:
+            generation = data_generation.value
+            value = await build()
+            self.set(key, value, generation)
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "generation": data_generation.value,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "not_modified": self.not_modified,
+        }
+
+response_cache = GenerationCache()
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+async def cached_json_response(request: Request, build) -> Response:
+    """
+    JSON response of the pydantic model returned by `await build()`, cached per path + query
+    parameters with a strong ETag (hash of the body). A matching If-None-Match is answered with 304.
+    """
+    async def render():
+        body = dump_json(await build())
+        return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"', body
+
+    key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+    etag, body = await response_cache.get_or_build(key, render)
+    # no-cache: browsers keep the body but revalidate every time (cheap 304s between crawls)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
@@ -3,8 +3,10 @@ from loguru import logger
 from wechatpy import parse_message, create_reply
 from wechatpy.utils import check_signature
 from wechatpy.exceptions import InvalidSignatureException
+import asyncio
 import os
-from database import SessionLocal, NewsItem
+from latest_news import latest_news
+from wechat_commands import command_router
 
 router = APIRouter(prefix="/api/v1/wechat", tags=["wechat"])
 
@@ -12,6 +14,21 @@ WECHAT_TOKEN = os.getenv("WECHAT_TOKEN", "your_token_here")
 WECHAT_APPID = os.getenv("WECHAT_APPID", "")
 WECHAT_AES_KEY = os.getenv("WECHAT_AES_KEY", "")
 
+def _build_crypto():
+    """
+    Message crypto for encrypt_type=aes, built once at startup (None if not configured).
+    """
+    if not WECHAT_AES_KEY or not WECHAT_APPID:
+        return None
+    try:
+        from wechatpy.crypto import WeChatCrypto
+        return WeChatCrypto(WECHAT_TOKEN, WECHAT_AES_KEY, WECHAT_APPID)
+    except Exception as e:
+        logger.error(f"WeChat crypto setup failed: {e}")
+        return None
+
+crypto = _build_crypto()
+
 @router.get("")
 async def wechat_verify(signature: str, timestamp: str, nonce: str, echostr: str):
     """
@@ -39,15 +56,11 @@ async def wechat_message(request: Request, signature: str, timestamp: str, nonce
     body = await request.body()
     
     # 3. Decrypt if needed
-    crypto = None
     if encrypt_type == 'aes':
+        if crypto is None:
+            logger.error("WeChat AES Key or AppID not configured for encryption")
+            raise HTTPException(status_code=500, detail="Server configuration error")
         try:
-            from wechatpy.crypto import WeChatCrypto
-            if not WECHAT_AES_KEY or not WECHAT_APPID:
-                logger.error("WeChat AES Key or AppID not configured for encryption")
-                raise HTTPException(status_code=500, detail="Server configuration error")
-                
-            crypto = WeChatCrypto(WECHAT_TOKEN, WECHAT_AES_KEY, WECHAT_APPID)
             decrypted_xml = crypto.decrypt_message(body, msg_signature, timestamp, nonce)
             msg = parse_message(decrypted_xml)
         except InvalidSignatureException:
@@ -61,29 +74,13 @@ async def wechat_message(request: Request, signature: str, timestamp: str, nonce
     # 4. Handle message logic
     reply = None
     if msg.type == 'text':
-        content = msg.content.strip()
-        if content in ["最新", "日报", "news"]:
-            # Query DB for latest news
-            db = SessionLocal()
-            try:
-                items = db.query(NewsItem).order_by(NewsItem.created_at.desc()).limit(5).all()
-                if items:
-                    articles = []
-                    for item in items:
-                        articles.append({
-                            "title": item.title,
-                            "description": item.summary[:50] + "..." if item.summary else "",
-                            "image": item.thumbnail or "",
-                            "url": item.url
-                        })
-                    # Create Article Reply (News)
-                    reply = create_reply(articles, msg)
-                else:
-                    reply = create_reply("暂无今日资讯", msg)
-            finally:
-                db.close()
-        else:
-            reply = create_reply("收到您的消息：" + content + "\n回复【最新】获取 AI 日报", msg)
+        # Commands (最新, 日报, source / category keywords) reply with article lists pre-rendered
+        # in memory; news / digest commits mark them dirty and the writer rebuilds them once
+        # when done (refresh_if_dirty). Only a message arriving before the first load waits
+        if not latest_news.loaded:
+            await asyncio.to_thread(latest_news.refresh)
+        # Article Reply (News) for a list, Text Reply otherwise
+        reply = create_reply(command_router.reply(msg.content), msg)
     else:
         reply = create_reply("暂不支持此类消息", msg)
 
@@ -91,7 +88,7 @@ async def wechat_message(request: Request, signature: str, timestamp: str, nonce
     xml = reply.render()
     
     # 6. Encrypt if needed
-    if encrypt_type == 'aes' and crypto:
+    if encrypt_type == 'aes':
         encrypted_xml = crypto.encrypt_message(xml, nonce, timestamp)
         return Response(content=encrypted_xml, media_type="application/xml")
     
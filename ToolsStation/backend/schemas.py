@@ -0,0 +1,76 @@
+import datetime
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict
+
+try:
+    import orjson
+except ImportError:  # pydantic's own serializer is nearly as fast
+    orjson = None
+
+class NewsItemOut(BaseModel):
+    """
+    A NewsItem as returned by the list (/api/v1/news, /api/v1/news/top) and detail
+    endpoints. Every column is included: the frontend shows original_desc when there is
+    no real summary and filters on it.
+    """
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    title: Optional[str] = None
+    url: Optional[str] = None
+    source: Optional[str] = None
+    original_desc: Optional[str] = None
+    summary: Optional[str] = None
+    category: Optional[str] = None
+    stars: Optional[str] = None
+    upvotes: Optional[str] = None
+    thumbnail: Optional[str] = None
+    created_at: Optional[datetime.datetime] = None
+    stars_count: Optional[int] = None
+    upvotes_count: Optional[int] = None
+    hotness: int = 0
+
+class NewsPage(BaseModel):
+    status: str = "success"
+    data: List[NewsItemOut]
+    next_cursor: Optional[str] = None
+
+class TopNews(BaseModel):
+    status: str = "success"
+    data: Dict[str, List[NewsItemOut]]  # source name -> items, best first
+
+class NewsDetail(BaseModel):
+    status: str = "success"
+    data: NewsItemOut
+
+class DigestItem(BaseModel):
+    id: int
+    title: Optional[str] = None
+    url: Optional[str] = None
+    source: Optional[str] = None
+    summary: str = ""  # truncated to digest.DIGEST_SUMMARY_CHARS
+    thumbnail: Optional[str] = None
+
+class Digest(BaseModel):
+    """
+    A stored digest snapshot (digest.render_digest) with its pre-rendered payloads.
+    """
+    day: str
+    edition: str
+    created_at: datetime.datetime
+    items: List[DigestItem]
+    feishu_title: str
+    feishu_markdown: str
+    wechat_articles: List[Dict[str, str]]
+
+class DigestResponse(BaseModel):
+    status: str = "success"
+    data: Digest
+
+def dump_json(model: BaseModel) -> bytes:
+    """
+    JSON body of a response model, through orjson when installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(model.model_dump())
+    return model.model_dump_json().encode("utf-8")
@@ -1,53 +1,38 @@
+import asyncio
 import httpx
 from loguru import logger
 from typing import List, Dict, Any, Optional
 import os
 from wechatpy import WeChatClient
 from wechatpy.exceptions import WeChatClientException
-from database import SessionLocal, NewsItem
-from datetime import datetime, date
+from digest import current_digest
 
 class NotificationService:
     def __init__(self):
         pass
 
-    async def push_daily_digest(self):
+    async def push_daily_digest(self, digest: Optional[dict] = None):
         """
         推送每日摘要到配置的渠道
+        :param digest: 摘要快照（digest.materialize_digest）；默认取今日快照，
+            尚未生成时（如 08:00 前手动推送）推送临时摘要，不写入快照
         """
-        db = SessionLocal()
         try:
-            # 获取最新的 10 条资讯
-            items = db.query(NewsItem).order_by(NewsItem.created_at.desc()).limit(10).all()
-            if not items:
+            if digest is None:
+                digest = await asyncio.to_thread(current_digest)
+            if not digest:
                 logger.info("No news to push.")
                 return
 
-            date_str = date.today().strftime("%Y-%m-%d")
-            
-            # 格式化飞书消息
-            feishu_content = ""
-            for idx, item in enumerate(items, 1):
-                feishu_content += f"**{idx}. [{item.title}]({item.url})**\n"
-                if item.summary:
-                    # 截断摘要以避免过长
-                    summary = item.summary[:100] + "..." if len(item.summary) > 100 else item.summary
-                    feishu_content += f"{summary}\n"
-                feishu_content += f"_{item.source}_\n\n"
-            
-            feishu_content += "\n[查看完整列表](http://localhost:3000)" # TODO: 配置前端 URL
-
-            # 发送飞书
+            # 发送飞书（标题与 Markdown 已在快照中渲染好）
             webhook_url = os.getenv("FEISHU_WEBHOOK_URL")
             if webhook_url:
-                await self.send_feishu_webhook(webhook_url, f"AI Daily Digest - {date_str}", feishu_content)
+                await self.send_feishu_webhook(webhook_url, digest["feishu_title"], digest["feishu_markdown"])
             else:
                 logger.info("FEISHU_WEBHOOK_URL not set, skipping Feishu push.")
 
         except Exception as e:
             logger.error(f"Error in push_daily_digest: {e}")
-        finally:
-            db.close()
 
     async def send_feishu_webhook(self, webhook_url: str, title: str, content: str):
         """
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+from summary_tiers import DEFAULT_POLICY, TierPolicy
+
+# Schedule groups -> refresh interval in minutes.
+# Fast JSON APIs are cheap to poll; HTML scrapes are heavier and change slower.
+SCHEDULES = {
+    "fast": 15,
+    "hourly": 60,
+}
+
+@dataclass(frozen=True)
+class Source:
+    """
+    A crawler source plugin.
+    key: short id used in APIs / stats, name: value stored in NewsItem.source.
+    concurrency: max in-flight HTTP requests for this source.
+    timeout: deadline (seconds) for the whole fetch.
+    schedule: one of SCHEDULES.
+    summary_tiers: which summary tier (local / fast / strong model) each item gets.
+    popularity_scale: stars / upvotes count that scores popularity.HOTNESS_AT_SCALE
+    (None: the source has no counts, its items get hotness 0).
+    keywords: extra WeChat message keywords (besides key and name) that reply with this source's news.
+    """
+    key: str
+    name: str
+    fetcher: Callable
+    concurrency: int = 2
+    timeout: float = 15.0
+    schedule: str = "hourly"
+    summary_tiers: TierPolicy = DEFAULT_POLICY
+    popularity_scale: Optional[int] = None
+    keywords: Tuple[str, ...] = ()
+
+_registry: Dict[str, Source] = {}
+
+def register_source(key: str, name: str, concurrency: int = 2, timeout: float = 15.0, schedule: str = "hourly",
+                    summary_tiers: TierPolicy = DEFAULT_POLICY, popularity_scale: Optional[int] = None,
+                    keywords: Tuple[str, ...] = ()):
+    """
+    Decorator that registers an async fetcher `async def fetch(engine) -> list[dict]` as a source.
+    """
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule '{schedule}' for source '{key}'")
+
+    def decorator(fetcher: Callable) -> Callable:
+        if key in _registry:
+            raise ValueError(f"Source '{key}' is already registered")
+        _registry[key] = Source(key=key, name=name, fetcher=fetcher,
+                                concurrency=concurrency, timeout=timeout, schedule=schedule,
+                                summary_tiers=summary_tiers, popularity_scale=popularity_scale,
+                                keywords=keywords)
+        return fetcher
+    return decorator
+
+def get_sources(keys: Optional[List[str]] = None, schedule: Optional[str] = None) -> List[Source]:
+    """
+    Returns registered sources, optionally restricted to the given keys and/or schedule group.
+    """
+    if keys:
+        unknown = [key for key in keys if key not in _registry]
+        if unknown:
+            raise ValueError(f"Unknown sources: {', '.join(unknown)}")
+    if schedule and schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule '{schedule}'")
+
+    sources = list(_registry.values())
+    if keys:
+        sources = [s for s in sources if s.key in keys]
+    if schedule:
+        sources = [s for s in sources if s.schedule == schedule]
+    return sources
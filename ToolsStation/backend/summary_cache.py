@@ -0,0 +1,81 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from loguru import logger
+
+def normalize_text(text: str) -> str:
+    """
+    Collapses whitespace so trivially different copies of the same text share a cache entry.
+    """
+    return " ".join((text or "").split())
+
+class SummaryCache:
+    """
+    Disk-backed summary cache (separate SQLite file) keyed by
+    sha256(model, prompt template version, normalized text).
+    Size-bounded with LRU eviction: hits refresh last_used, and inserts beyond
+    max_entries evict the least recently used rows. Thread-safe; keeps hit/miss counters.
+    """
+    def __init__(self, path: str = None, max_entries: int = None):
+        self.path = path or os.getenv("SUMMARY_CACHE_PATH", "./summary_cache.db")
+        self.max_entries = max_entries or int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            "key TEXT PRIMARY KEY, summary TEXT NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_summaries_last_used ON summaries (last_used)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model: str, template_version: str, text: str) -> str:
+        raw = "\x1f".join([model, template_version, normalize_text(text)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE summaries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, summary: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, last_used) VALUES (?, ?, ?)",
+                (key, summary, time.time())
+            )
+            size = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            overflow = size - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM summaries WHERE key IN "
+                    "(SELECT key FROM summaries ORDER BY last_used ASC LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+                logger.debug(f"Summary cache evicted {overflow} entries")
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
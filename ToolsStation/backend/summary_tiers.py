@@ -0,0 +1,64 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+from llm_metrics import _percentile
+from popularity import parse_count
+
+# Cheapest first: offline extractive summary, fast LLM model, strong LLM model
+TIERS = ("local", "fast", "strong")
+
+@dataclass(frozen=True)
+class TierPolicy:
+    """
+    Picks the summary tier of an item.
+    - descriptions shorter than short_chars have nothing worth an LLM call: local
+    - descriptions of at least long_chars, or items with stars / upvotes >= popular_at: strong
+    - everything else: fast
+    popular_at=None disables the popularity rule (sources without counts).
+    """
+    short_chars: int = 60
+    long_chars: int = 400
+    popular_at: Optional[int] = None
+
+    def choose(self, text: str, popularity=None) -> str:
+        length = len((text or "").strip())
+        if length < self.short_chars:
+            return "local"
+        if length >= self.long_chars:
+            return "strong"
+        if self.popular_at is not None and parse_count(popularity) >= self.popular_at:
+            return "strong"
+        return "fast"
+
+DEFAULT_POLICY = TierPolicy()
+
+class TierMetrics:
+    """
+    Per tier item counts and per request latency (last `window` samples for percentiles).
+    """
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._tiers = {tier: {"items": 0, "requests": 0, "latency": deque(maxlen=window)} for tier in TIERS}
+
+    def record(self, tier: str, items: int, latency: float):
+        with self._lock:
+            series = self._tiers[tier]
+            series["items"] += items
+            series["requests"] += 1
+            series["latency"].append(latency)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                tier: {
+                    "items": series["items"],
+                    "requests": series["requests"],
+                    "latency_p50": _percentile(series["latency"], 0.5),
+                    "latency_p95": _percentile(series["latency"], 0.95),
+                }
+                for tier, series in self._tiers.items()
+            }
+
+tier_metrics = TierMetrics()
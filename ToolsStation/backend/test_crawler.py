@@ -0,0 +1,109 @@
+import asyncio
+import httpx
+from crawler import CrawlerEngine
+from sources import get_sources
+
+def run_with_transport(handler, sources):
+    async def _run():
+        async with CrawlerEngine(transport=httpx.MockTransport(handler)) as engine:
+            return await engine.run(sources)
+    return asyncio.run(_run())
+
+def test_engine_runs_sources_on_shared_client():
+    """
+    All sources run on one engine; a failing source yields [] without affecting others.
+    """
+    def handler(request):
+        if request.url.host == "api.juejin.cn":
+            return httpx.Response(200, json={"data": [
+                {"article_info": {"title": "LLM 推理优化", "article_id": "1", "brief_content": "desc", "digg_count": 7}}
+            ]})
+        raise httpx.ConnectError("boom", request=request)
+
+    results = run_with_transport(handler, get_sources(["jj", "rd"]))
+    assert results["rd"].items == []
+    assert results["jj"].items[0]["url"] == "https://juejin.cn/post/1"
+    assert results["jj"].items[0]["upvotes"] == "7"
+
+def test_source_registry_selects_subsets():
+    from sources import get_sources
+    fast = {s.key for s in get_sources(schedule="fast")}
+    assert fast == {"jj", "rd"}
+    assert [s.key for s in get_sources(["gh"])] == ["gh"]
+
+def test_hotness_comparable_across_registered_sources():
+    from popularity import HOTNESS_AT_SCALE, hotness_score
+    scales = {s.key: s.popularity_scale for s in get_sources()}
+    # The hotness_score docstring example
+    assert hotness_score(5000, scales["gh"]) == hotness_score(1000, scales["rd"]) == HOTNESS_AT_SCALE
+    assert hotness_score(500, scales["rd"]) < HOTNESS_AT_SCALE
+
+def test_conditional_get_skips_unchanged_pages():
+    """
+    Second crawl sends the stored ETag; a 304 marks the source not_modified with no items.
+    """
+    from http_cache import ValidatorCache
+    html = '<article class="Box-row"><h2><a href="/a/b">a / b</a></h2><p>demo</p></article>'
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, text=html, headers={"ETag": '"v1"'})
+
+    async def _run(validators):
+        async with CrawlerEngine(validators=validators, transport=httpx.MockTransport(handler)) as engine:
+            return await engine.run(get_sources(["gh"]))
+
+    first = asyncio.run(_run(ValidatorCache()))["gh"]
+    assert not first.not_modified and first.items[0]["url"] == "https://github.com/a/b"
+    stored = ValidatorCache({"https://github.com/trending/python?since=daily": ('"v1"', None)})
+    second = asyncio.run(_run(stored))["gh"]
+    assert second.not_modified and second.items == []
+    assert seen == [None, '"v1"']
+
+def test_fingerprint_store_detects_unchanged_items():
+    from fingerprints import FingerprintStore, hash_items
+    items = [{"url": "u1", "title": "a"}, {"url": "u2", "title": "b"}]
+    store = FingerprintStore({"gh": ("old-body", hash_items(items))})
+    # Different raw body (e.g. rotating tokens) but same items in another order
+    assert store.check("gh", "new-body", list(reversed(items)))
+    assert not store.check("gh", "new-body", items + [{"url": "u3", "title": "c"}])
+
+def test_parser_backends_agree_on_fixtures():
+    """
+    The fast lxml backend must produce exactly what the BeautifulSoup reference does, on every
+    fixture (<parser method>*.html, e.g. github_trending.html or a dated saved snapshot).
+    """
+    import glob
+    import os
+    from parsers import LxmlParser, ParserBackend, SoupParser
+    methods = sorted(ParserBackend.__abstractmethods__)
+    fixtures = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "benchmarks", "fixtures", "*.html")))
+    assert fixtures
+    for path in fixtures:
+        method = next(name for name in methods if os.path.basename(path).startswith(name))
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        fast = getattr(LxmlParser(), method)(html)
+        assert fast and fast == getattr(SoupParser(), method)(html), path
+
+def test_incomplete_parser_backend_fails_on_creation():
+    import pytest
+    from parsers import ParserBackend
+
+    class Partial(ParserBackend):
+        def github_trending(self, html):
+            return []
+    with pytest.raises(TypeError):
+        Partial()
+
+def test_parser_backends_agree_on_qbitai_intro_edge_cases():
+    from parsers import LxmlParser, SoupParser
+    html = """<div class="text_box"><h4><a href="https://www.qbitai.com/1">Empty intro</a></h4><p class="intro"> </p></div>
+    <div class="text_box"><h4><a href="https://www.qbitai.com/2">No intro</a></h4></div>
+    <div class="text_box"><h4><a href="https://www.qbitai.com/3">With intro</a></h4><p class="intro">Intro</p></div>"""
+    items = LxmlParser().qbitai(html)
+    assert items == SoupParser().qbitai(html)
+    assert [item["description"] for item in items] == ["Empty intro", "No intro", "Intro"]
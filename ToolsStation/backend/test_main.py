@@ -5,8 +5,7 @@ from database import init_db, SessionLocal, NewsItem
 
 client = TestClient(app)
 
-# Initialize DB for tests (in-memory or file-based, here we use the same file for simplicity 
-# but in real world we should use a test.db)
+# conftest.py points the engines at a temporary database
 init_db()
 
 def test_read_root():
@@ -45,3 +44,518 @@ def test_llm_mock_summary():
     summary = llm_service.generate_summary("This is a test article about AI.")
     assert "[测试模式]" in summary
     assert "This is a test article" in summary
+
+def test_summary_cache_lru(tmp_path):
+    """
+    Whitespace-normalized keys hit; the least recently used entry is evicted first.
+    """
+    from summary_cache import SummaryCache
+    cache = SummaryCache(path=str(tmp_path / "cache.db"), max_entries=2)
+    key_a = SummaryCache.make_key("m", "v1", "Some  text\n about AI")
+    assert key_a == SummaryCache.make_key("m", "v1", " Some text about AI ")
+    key_b = SummaryCache.make_key("m", "v1", "other")
+    key_c = SummaryCache.make_key("m", "v1", "third")
+
+    cache.set(key_a, "A")
+    cache.set(key_b, "B")
+    assert cache.get(key_a) == "A"  # a is now more recent than b
+    cache.set(key_c, "C")
+    assert cache.get(key_b) is None
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+def test_get_metrics():
+    response = client.get("/api/v1/metrics")
+    assert response.status_code == 200
+    assert "summary_cache" in response.json()["data"]
+
+def test_batch_summaries_fall_back_per_item(fake_llm):
+    """
+    One request for the batch; an item missing from the JSON reply is summarized on its own.
+    """
+    import json
+    from types import SimpleNamespace
+
+    calls = []
+    def create(**kwargs):
+        calls.append(kwargs)
+        if "response_format" in kwargs:
+            content = json.dumps({"summaries": [{"id": "0", "summary": "批量摘要"}]})
+        else:
+            content = "单条摘要"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    service = fake_llm(create)
+
+    summaries = service.generate_summaries([{"text": "first"}, {"text": "second"}])
+    assert summaries == ["批量摘要", "单条摘要"]
+    assert len(calls) == 2
+    # Both are cached now: no further requests
+    assert service.generate_summaries([{"text": "first"}, {"text": "second"}]) == summaries
+    assert len(calls) == 2
+
+def test_async_summary_retries_rate_limit(fake_llm):
+    """
+    A 429 halves the adaptive limit, honors Retry-After and is retried instead of
+    producing failure text; a permanent error raises SummaryError.
+    """
+    import asyncio
+    import httpx
+    import openai
+    import pytest
+    from types import SimpleNamespace
+    from llm_service import SummaryError
+
+    request = httpx.Request("POST", "https://llm.test/v1/chat/completions")
+    replies = [
+        openai.RateLimitError("slow down", response=httpx.Response(429, headers={"retry-after": "0"}, request=request), body=None),
+        SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="摘要"))]),
+        openai.BadRequestError("bad", response=httpx.Response(400, request=request), body=None),
+    ]
+    async def create(**kwargs):
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    service = fake_llm(create)
+    service.limiter.limit = 8
+
+    assert asyncio.run(service.asummarize("text about AI")) == "摘要"
+    assert service.limiter.rate_limited == 1 and service.limiter.limit < 8
+    with pytest.raises(SummaryError):
+        asyncio.run(service.asummarize("another text"))
+
+def test_only_permanent_summary_errors_fall_back(fake_llm, monkeypatch):
+    """
+    Retries exhausted (5xx): no summary, so nothing is stored and the next run asks again.
+    A rejected request gets the extractive summary.
+    """
+    import asyncio
+    import httpx
+    import openai
+    import llm_service
+
+    monkeypatch.setattr(llm_service, "MAX_RETRIES", 0)
+    request = httpx.Request("POST", "https://llm.test/v1/chat/completions")
+    errors = [openai.InternalServerError("down", response=httpx.Response(503, request=request), body=None)]
+    async def create(**kwargs):
+        raise errors[0]
+
+    service = fake_llm(create)
+    text = "研究人员发布了新的开源模型。它在消费级显卡上实现了高效推理。"
+    assert asyncio.run(service.asummarize_batch([{"text": text}])) == [None]
+    assert service.fallbacks == 0
+
+    errors[0] = openai.BadRequestError("bad", response=httpx.Response(400, request=request), body=None)
+    summary, = asyncio.run(service.asummarize_batch([{"text": text}]))
+    assert summary.startswith("[自动提取]") and service.fallbacks == 1
+
+def test_adaptive_limiter_latency_baseline_per_call_kind():
+    """
+    Batches are slower than single calls without any queueing: mixing them must not
+    shrink the limit, and a lasting slowdown of one kind becomes its new baseline.
+    """
+    from adaptive_limiter import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(initial=8)
+    for _ in range(30):
+        limiter.on_success(1.0, key=("fast", 1))
+        limiter.on_success(4.0, key=("fast", 8))
+    assert limiter.limit > 8
+
+    limiter = AdaptiveLimiter(initial=8)
+    limiter.on_success(1.0)
+    for _ in range(30):
+        limiter.on_success(4.0)
+    assert limiter.limit >= 4  # a few cuts, then the baseline has caught up
+
+def test_adaptive_limiter_shared_by_two_event_loops():
+    """
+    The API loop and a pipeline loop (another thread) share one limiter: the cap holds
+    across both, every waiter is woken and nothing stays in flight.
+    """
+    import asyncio
+    import threading
+    from adaptive_limiter import AdaptiveLimiter
+
+    limiter = AdaptiveLimiter(initial=3)
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    async def call():
+        async with limiter:
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.005)
+            with lock:
+                active[0] -= 1
+
+    async def run():
+        await asyncio.gather(*(call() for _ in range(30)))
+
+    threads = [threading.Thread(target=asyncio.run, args=(run(),), daemon=True) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert peak[0] == 3 and limiter.in_flight == 0
+
+def test_stream_summary_records_ttft(fake_llm):
+    import asyncio
+    from types import SimpleNamespace
+    from llm_metrics import llm_metrics
+
+    def chunk(content=None, usage=None):
+        choices = [SimpleNamespace(delta=SimpleNamespace(content=content))] if content else []
+        return SimpleNamespace(choices=choices, usage=usage)
+
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        async def stream():
+            for part in ["大模型", "推理", "加速"]:
+                yield chunk(part)
+            yield chunk(usage=SimpleNamespace(prompt_tokens=50, completion_tokens=3))
+        return stream()
+
+    service = fake_llm(create)
+    service.model = "stream-test-model"
+
+    async def collect():
+        return [delta async for delta in service.astream_summary("text")]
+    assert asyncio.run(collect()) == ["大模型", "推理", "加速"]
+
+    series = next(s for s in llm_metrics.snapshot() if s["model"] == "stream-test-model")
+    assert series["calls"] == 1 and series["completion_tokens"] == 3
+    assert series["ttft_p50"] is not None and series["ttft_p50"] <= series["latency_p50"]
+
+def test_local_summarizer_caches_articles(tmp_path):
+    """
+    No-API-key path: download on the run's client, extract in the process pool, then
+    serve repeat URLs from the on-disk article cache without downloading again.
+    """
+    import asyncio
+    import httpx
+    from llm_service import LLMService
+    from local_summarizer import LocalSummarizer
+
+    paragraph = "研究人员发布了一个新的开源模型，在消费级显卡上实现了高效推理，性能提升明显。"
+    html = "<html><head><title>New model</title></head><body><article>" + \
+        "".join(f"<p>{paragraph * 3}</p>" for _ in range(5)) + "</article></body></html>"
+    downloads = []
+    def handler(request):
+        downloads.append(str(request.url))
+        return httpx.Response(200, text=html)
+
+    summarizer = LocalSummarizer(workers=1, cache_path=str(tmp_path / "articles.db"),
+                                 transport=httpx.MockTransport(handler))
+    items = [{"url": "https://example.test/a", "text": "fallback"}] * 2
+    clients = []
+    async def run(batch):
+        try:
+            clients.append(summarizer._http.get()[0])
+            return await summarizer.summarize_many(batch)
+        finally:
+            await summarizer.aclose()
+    service = LLMService()
+    service.local = summarizer
+    try:
+        first = asyncio.run(run(items[:1]))
+        second = asyncio.run(run(items))
+        # Sync entry point: its one-off loop's client is closed too
+        third = service.generate_local_summary("https://example.test/b", "fallback")
+    finally:
+        summarizer.shutdown()
+
+    assert first[0].startswith("[自动提取]") and "开源模型" in first[0]
+    assert second == first * 2
+    assert third == first[0]
+    assert downloads == ["https://example.test/a", "https://example.test/b"]
+    assert "高效推理" in summarizer.cached_text("https://example.test/a")
+    # One client per run, each closed when its run ended
+    assert clients[0] is not clients[1] and all(client.is_closed for client in clients)
+    assert len(summarizer._http) == 0
+
+def test_extractive_summary_picks_central_sentences():
+    from extractive import ExtractiveSummarizer
+
+    summarizer = ExtractiveSummarizer(max_chars=60)
+    text = ("新的开源模型在推理速度上大幅领先。开源模型支持消费级显卡推理。"
+            "发布会在周二举行，现场天气晴朗。新的开源模型推理成本降低一半。")
+    summary, short, empty = summarizer.summarize_many([text, "短文本", ""])
+
+    assert len(summary) <= 60 + len("...")
+    assert "开源模型" in summary and "天气" not in summary
+    assert summary.startswith("新的开源模型")  # original sentence order is kept
+    assert short == "短文本" and empty == ""
+
+def test_tiered_summaries_route_by_length_and_popularity(fake_llm):
+    """
+    Short items never reach the LLM; medium items use the fast model, long or popular
+    items the strong one.
+    """
+    import asyncio
+    from types import SimpleNamespace
+    from summary_tiers import TierPolicy, parse_count
+
+    policy = TierPolicy(short_chars=20, long_chars=200, popular_at=1000)
+    medium, long_text = "x" * 50, "y" * 300
+    assert [policy.choose("short"), policy.choose(medium, "12"), policy.choose(medium, "1.2k"),
+            policy.choose(long_text)] == ["local", "fast", "strong", "strong"]
+    assert parse_count("1,234") == 1234 and parse_count(None) == 0
+
+    models = []
+    async def create(**kwargs):
+        models.append(kwargs["model"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=kwargs["model"]))])
+
+    service = fake_llm(create)
+    service.tier_models = {"fast": "fast-model", "strong": "strong-model"}
+
+    summaries = asyncio.run(service.asummarize_tiered([
+        {"text": "short", "tier": "local"},
+        {"text": medium, "tier": "fast"},
+        {"text": long_text, "tier": "strong"},
+    ]))
+    assert summaries == ["[自动提取] short", "fast-model", "strong-model"]
+    assert sorted(models) == ["fast-model", "strong-model"]
+
+def test_local_tier_is_summarized_in_one_batch(fake_llm, monkeypatch):
+    import asyncio
+    import local_summarizer
+    from extractive import extractive_summarizer
+
+    calls = []
+    summarize_many = extractive_summarizer.summarize_many
+    def counted(texts):
+        calls.append(len(texts))
+        return summarize_many(texts)
+    monkeypatch.setattr(extractive_summarizer, "summarize_many", counted)
+
+    async def create(**kwargs):
+        raise AssertionError("local items never reach the LLM")
+    service = fake_llm(create)
+    sentence = "研究人员发布了新的开源模型，在消费级显卡上实现了高效推理。"
+    items = [{"text": f"第{i}条。" + sentence * 8, "url": f"https://local.test/{i}", "tier": "local"}
+             for i in range(local_summarizer.EXTRACTIVE_THREAD_MIN + 4)]  # large enough for a thread
+    summaries = asyncio.run(service.asummarize_tiered(items))
+    assert calls == [len(items)]
+    assert all(summary.startswith("[自动提取]") for summary in summaries)
+
+def test_prompt_builder_budget_and_stable_prefix():
+    from prompt_builder import PromptBuilder, HeuristicTokenizer
+
+    builder = PromptBuilder(max_content_tokens=50, tokenizer=HeuristicTokenizer())
+    long_text = "模型推理速度提升。" * 40
+    first = builder.summary_messages(long_text, "Source: A")
+    second = builder.summary_messages("short   text\n\n", "Source: B")
+
+    assert first[0] == second[0]  # identical system prefix
+    assert second[1]["content"].endswith("Content: short text")
+    assert builder.tokenizer.count(first[1]["content"].split("Content: ", 1)[1]) <= 50
+    assert first[1]["content"].endswith("。")  # cut at a sentence end
+
+    totals = builder.accounting.since({})
+    assert totals["requests"] == 2 and totals["truncated_items"] == 1
+    assert totals["content_tokens_saved"] == 360 - 45
+
+def test_async_database_url():
+    from database import async_database_url
+
+    assert async_database_url("sqlite:///./news.db") == "sqlite+aiosqlite:///./news.db"
+    assert async_database_url("postgresql+psycopg2://u:p@db:5432/news") == "postgresql+asyncpg://u:p@db:5432/news"
+
+def test_news_keyset_pagination_and_filters(db):
+    import datetime
+
+    base = datetime.datetime(2020, 1, 1)
+    db.add_all([
+        NewsItem(title=f"pager {i}", url=f"https://pager.test/{i}", source="Test Pager",
+                 category="Technology" if i % 2 else "Product",
+                 created_at=base + datetime.timedelta(hours=i // 2))  # pairs share created_at
+        for i in range(7)
+    ])
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        params = {"sources": "Test Pager", "limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v1/news", params=params).json()
+        seen += [item["title"] for item in body["data"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            break
+    assert seen == [f"pager {i}" for i in (6, 5, 4, 3, 2, 1, 0)]
+
+    body = client.get("/api/v1/news", params={
+        "sources": "Test Pager", "category": "Technology", "since": "2020-01-01T01:00:00", "until": "2020-01-01T03:00:00"
+    }).json()
+    assert [item["title"] for item in body["data"]] == ["pager 5", "pager 3"]
+    assert client.get("/api/v1/news", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_top_news_per_source(db):
+    from popularity import popularity_fields
+
+    # Older items are more popular, so the two orders disagree
+    db.add_all([
+        NewsItem(title=f"{source} {i}", url=f"https://top.test/{source}/{i}", source=f"Test Top {source}",
+                 **popularity_fields(f"{4 - i},000" if source == "gh" else None,
+                                     None if source == "gh" else str(4 - i), 5000))
+        for source in ("gh", "rd") for i in range(4)
+    ])
+    db.commit()
+
+    params = {"n": 2, "sources": ["Test Top gh", "Test Top rd"]}
+    recent = client.get("/api/v1/news/top", params=params).json()["data"]
+    assert [item["title"] for item in recent["Test Top gh"]] == ["gh 3", "gh 2"]
+
+    popular = client.get("/api/v1/news/top", params={**params, "order": "popular"}).json()["data"]
+    assert set(popular) == {"Test Top gh", "Test Top rd"}
+    assert [item["title"] for item in popular["Test Top gh"]] == ["gh 0", "gh 1"]
+    assert [item["title"] for item in popular["Test Top rd"]] == ["rd 0", "rd 1"]
+    assert popular["Test Top gh"][0]["stars_count"] == 4000 and popular["Test Top gh"][0]["hotness"] > 0
+
+    hot = client.get("/api/v1/news", params={"sources": params["sources"], "order": "hot", "limit": 2}).json()
+    assert [item["title"] for item in hot["data"]] == ["gh 0", "gh 1"]  # 4k stars beat 4 upvotes
+    page = client.get("/api/v1/news", params={"sources": params["sources"], "order": "hot", "limit": 2,
+                                              "cursor": hot["next_cursor"]}).json()
+    assert [item["title"] for item in page["data"]] == ["gh 2", "gh 3"]
+    assert client.get("/api/v1/news/top", params={"order": "random"}).status_code == 400
+
+def test_news_response_cache_etag_and_invalidation(db):
+    from database import HttpValidator, data_generation
+
+    params = {"sources": "Test Cache", "limit": 5}
+    first = client.get("/api/v1/news", params=params)
+    etag = first.headers["etag"]
+    assert first.json()["data"] == []
+
+    cached = client.get("/api/v1/news", params=params, headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["etag"] == etag
+
+    generation = data_generation.value
+    db.add(NewsItem(title="cached", url="https://cache.test/1", source="Test Cache"))
+    db.commit()
+    assert data_generation.value > generation  # commit invalidates the cache
+
+    fresh = client.get("/api/v1/news", params=params, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+
+    # Crawl bookkeeping (validators, fingerprints) keeps the cached responses
+    db.add(HttpValidator(url="https://cache.test/validator", etag="1"))
+    db.commit()
+    cached = client.get("/api/v1/news", params=params, headers={"If-None-Match": fresh.headers["etag"]})
+    assert cached.status_code == 304
+
+    assert [item["title"] for item in fresh.json()["data"]] == ["cached"]
+
+def test_news_list_and_detail_schemas(db):
+    item = NewsItem(title="schema", url="https://schema.test/1", source="Test Schema",
+                    original_desc="long original description", summary="摘要")
+    db.add(item)
+    db.commit()
+
+    listed = client.get("/api/v1/news", params={"sources": "Test Schema"}).json()["data"]
+    assert [row["title"] for row in listed] == ["schema"]
+    # The frontend falls back to / filters on original_desc, so the list keeps it
+    assert listed[0]["original_desc"] == "long original description" and listed[0]["summary"] == "摘要"
+
+    detail = client.get(f"/api/v1/news/{item.id}").json()["data"]
+    assert detail == listed[0]
+    assert client.get("/api/v1/news/999999999").status_code == 404
+
+def test_digest_snapshot_is_materialized_once(db):
+    import datetime
+    from digest import digest_store, materialize_digest
+
+    day = "1999-12-31"
+    future = datetime.datetime(2999, 1, 1)  # newest rows, so they lead the digest
+    db.add(NewsItem(title="digest first", url="https://digest.test/1", source="Test Digest",
+                    summary="摘" * 150, created_at=future))
+    db.commit()
+    digest = materialize_digest(day)
+    assert digest["items"][0]["title"] == "digest first"
+    assert digest["items"][0]["summary"] == "摘" * 100 + "..."
+    assert "[digest first](https://digest.test/1)" in digest["feishu_markdown"]
+    assert digest["wechat_articles"][0]["description"] == "摘" * 50 + "..."
+
+    # Immutable: later items do not change the stored snapshot, in memory or in the database
+    db.add(NewsItem(title="digest later", url="https://digest.test/2", source="Test Digest",
+                    created_at=future + datetime.timedelta(hours=1)))
+    db.commit()
+    digest_store._snapshots.clear()
+    assert materialize_digest(day)["items"][0]["title"] == "digest first"
+
+    body = client.get("/api/v1/digest", params={"day": day}).json()["data"]
+    assert body["feishu_markdown"] == digest["feishu_markdown"]
+    assert client.get("/api/v1/digest", params={"day": "1999-01-01"}).status_code == 404
+
+def test_manual_notify_does_not_freeze_the_digest(db, monkeypatch):
+    import asyncio
+    import datetime
+    from database import DigestSnapshot
+    from digest import current_digest, materialize_digest, today
+    from services.notification import notification_service
+
+    pushed = []
+    async def send(url, title, content):
+        pushed.append(content)
+    monkeypatch.setenv("FEISHU_WEBHOOK_URL", "https://feishu.test/hook")
+    monkeypatch.setattr(notification_service, "send_feishu_webhook", send)
+
+    future = datetime.datetime(2999, 1, 1)
+    db.add(NewsItem(title="yesterday", url="https://notify.test/1", source="Test Notify", created_at=future))
+    db.commit()
+    # Before the 08:00 run: a provisional digest is pushed, nothing is stored
+    asyncio.run(notification_service.push_daily_digest())
+    assert "[yesterday]" in pushed[0] and db.query(DigestSnapshot).count() == 0
+    assert current_digest()["provisional"] is True
+
+    db.add(NewsItem(title="this morning", url="https://notify.test/2", source="Test Notify",
+                    created_at=future + datetime.timedelta(hours=1)))
+    db.commit()
+    digest = materialize_digest()
+    assert digest["items"][0]["title"] == "this morning" and "provisional" not in digest
+    assert current_digest(today()) == digest
+
+def test_wechat_commands_served_from_memory(db):
+    import datetime
+    import hashlib
+    from database import HttpValidator
+    from latest_news import latest_news
+    from routers.wechat import WECHAT_TOKEN
+    from wechat_commands import command_router
+
+    def send(text):
+        timestamp, nonce = "1700000000", "nonce"
+        signature = hashlib.sha1("".join(sorted([WECHAT_TOKEN, timestamp, nonce])).encode()).hexdigest()
+        body = ("<xml><ToUserName>gh</ToUserName><FromUserName>user</FromUserName><CreateTime>1700000000</CreateTime>"
+                f"<MsgType>text</MsgType><Content>{text}</Content><MsgId>1</MsgId></xml>")
+        response = client.post("/api/v1/wechat", params={"signature": signature, "timestamp": timestamp, "nonce": nonce},
+                               content=body.encode("utf-8"))
+        assert response.status_code == 200
+        return response.text
+
+    db.add(NewsItem(title="wechat newest", url="https://wechat.test/1", source="Test WeChat",
+                    summary="摘要", category="Product", created_at=datetime.datetime(2999, 1, 2)))
+    db.commit()
+    assert latest_news.dirty  # marked only; the writer rebuilds it once when done
+    latest_news.refresh_if_dirty()
+    assert not latest_news.dirty
+    assert latest_news.articles("latest")[0]["title"] == "wechat newest"
+    assert latest_news.articles("source:Test WeChat")[0]["title"] == "wechat newest"
+
+    assert "wechat newest" in send("最新")
+    assert "wechat newest" in send("产品") and "wechat newest" not in send("技术")
+    assert command_router.dispatch(" GitHub ") == command_router.dispatch("gh")
+    assert "回复【最新】" in send("hello")
+
+    # Commits of other tables leave the cache alone; bulk statements on news items mark it
+    db.add(HttpValidator(url="https://wechat.test/validator", etag="1"))
+    db.commit()
+    assert not latest_news.dirty
+    db.query(NewsItem).filter(NewsItem.source == "Test WeChat").update({NewsItem.summary: "新摘要"})
+    db.commit()
+    assert latest_news.dirty
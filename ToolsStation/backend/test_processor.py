@@ -0,0 +1,103 @@
+import asyncio
+from database import NewsItem
+from sources import Source
+import processor
+
+TEST_PREFIX = "https://example.test/pipeline/"
+
+async def fake_summaries(items):
+    return ["摘要"] * len(items)
+
+def make_source(key, count, delay=0.0, stars="1"):
+    async def fetch(engine):
+        await asyncio.sleep(delay)
+        return [{"title": f"{key} item {i}", "url": f"{TEST_PREFIX}{key}/{i}", "description": "LLM model release",
+                 "stars": stars, "thumbnail": "thumb.png" if stars == "1" else None}
+                for i in range(count)]
+    return Source(key=key, name=f"Test {key}", fetcher=fetch, timeout=5)
+
+def test_pipeline_streams_and_dedups(db, monkeypatch):
+    monkeypatch.setattr(processor.llm_service, "asummarize_batch", fake_summaries)
+    fast, slow = make_source("test-fast", 3), make_source("test-slow", 2, delay=0.3)
+
+    stats = asyncio.run(processor.NewsPipeline([fast, slow]).run())
+    assert stats["new"] == 5
+    # Fast source is stored before the slow one has even been fetched
+    assert stats["first_item_seconds"] < 0.3
+
+    stored = db.query(NewsItem).filter(NewsItem.url.like(TEST_PREFIX + "%")).all()
+    assert len(stored) == 5 and all(item.summary == "摘要" for item in stored)
+
+    # Same content again: skipped by the fingerprint check, nothing re-summarized
+    stats = asyncio.run(processor.NewsPipeline([fast, slow]).run())
+    assert stats["new"] == 0 and sorted(stats["unchanged"]) == ["test-fast", "test-slow"]
+
+def test_pipeline_upserts_stats_of_existing_items(db, monkeypatch):
+    monkeypatch.setattr(processor.llm_service, "asummarize_batch", fake_summaries)
+    asyncio.run(processor.NewsPipeline([make_source("test-gh", 3)]).run())
+
+    stats = asyncio.run(processor.NewsPipeline([make_source("test-gh", 3, stars="1,234")]).run())
+    assert stats["new"] == 0 and stats["updated"] == 3
+
+    stored = db.query(NewsItem).filter(NewsItem.url.like(TEST_PREFIX + "%")).all()
+    # Stats refreshed, summary untouched, missing thumbnail keeps the stored one
+    assert {(item.stars, item.summary, item.thumbnail) for item in stored} == {("1,234", "摘要", "thumb.png")}
+
+def test_process_news_twice_with_real_async_client(db, fake_llm, monkeypatch):
+    """
+    Each process_news run has its own event loop; the AsyncOpenAI client (and its pooled
+    keep-alive connections) of one run must not be reused by the next.
+    """
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class FakeOpenAI(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            body = json.dumps({
+                "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "test",
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": "服务端摘要"}}],
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    service = fake_llm()  # real AsyncOpenAI clients, pointed at the fake server
+    monkeypatch.setattr(processor, "llm_service", service)
+
+    def run(n):
+        async def fetch(engine):
+            return [{"title": f"run {n} item {i}", "url": f"{TEST_PREFIX}twice/{n}/{i}",
+                     "description": f"Run {n} item {i}: a new open source LLM model release with benchmarks and weights.",
+                     "stars": "1", "thumbnail": None}
+                    for i in range(2)]
+        source = Source(key="test-twice", name="Test twice", fetcher=fetch, timeout=5)
+        monkeypatch.setattr(processor, "get_sources", lambda *args, **kwargs: [source])
+        return processor.process_news()
+
+    from latest_news import latest_news
+    refreshes = latest_news.refreshes
+    try:
+        assert run(1)["new"] == 2
+        assert run(2)["new"] == 2
+        assert latest_news.refreshes == refreshes + 2  # one latest-news rebuild per run
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stored = db.query(NewsItem).filter(NewsItem.url.like(TEST_PREFIX + "twice/%")).all()
+    assert len(stored) == 4 and all(item.summary == "服务端摘要" for item in stored)
+    assert service.fallbacks == 0 and len(service.async_clients) == 0
@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Union
+from latest_news import latest_news
+from sources import get_sources
+
+EMPTY_REPLY = "暂无今日资讯"
+
+# Category (processor.determine_category) -> message keywords
+CATEGORY_KEYWORDS = {
+    "Technology": ("技术", "tech", "technology"),
+    "Product": ("产品", "product"),
+    "Other": ("其他", "other"),
+}
+
+@dataclass(frozen=True)
+class Command:
+    """
+    articles: latest_news list replied with; fallback: list used while that one is empty.
+    """
+    articles: str
+    fallback: Optional[str] = None
+
+class CommandRouter:
+    """
+    Maps a text message (stripped, case-insensitive) to a command with one dict lookup.
+    The table is built once, on first use, from the fixed commands, the registered sources
+    (key, name, Source.keywords) and the categories. Replies are the pre-rendered article
+    lists of latest_news, so adding commands adds no per-message work.
+    """
+    def __init__(self):
+        self._commands: Dict[str, Command] = {}
+        self.help_text = "回复【最新】获取 AI 日报"
+
+    def register(self, command: Command, *keywords: str):
+        for keyword in keywords:
+            self._commands[keyword.strip().lower()] = command
+
+    def build(self):
+        self.register(Command("latest"), "最新", "news", "latest")
+        self.register(Command("digest", fallback="latest"), "日报", "digest")
+        sources = get_sources()
+        for source in sources:
+            self.register(Command(f"source:{source.name}"), source.key, source.name, *source.keywords)
+        for category, keywords in CATEGORY_KEYWORDS.items():
+            self.register(Command(f"category:{category}"), *keywords)
+        examples = "、".join([source.keywords[0] if source.keywords else source.key for source in sources]
+                            + [keywords[0] for keywords in CATEGORY_KEYWORDS.values()])
+        self.help_text = f"回复【最新】获取 AI 日报，【日报】获取今日摘要，或按来源/分类查看：{examples}"
+
+    def dispatch(self, text: str) -> Optional[Command]:
+        if not self._commands:
+            self.build()
+        return self._commands.get(text.strip().lower())
+
+    def reply(self, text: str) -> Union[list, str]:
+        """
+        Articles (news reply) or text of a message.
+        """
+        command = self.dispatch(text)
+        if command is None:
+            return f"收到您的消息：{text.strip()}\n{self.help_text}"
+        articles = latest_news.articles(command.articles)
+        if not articles and command.fallback:
+            articles = latest_news.articles(command.fallback)
+        return articles or EMPTY_REPLY
+
+command_router = CommandRouter()